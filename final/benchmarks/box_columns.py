@@ -0,0 +1,48 @@
+#
+import os
+import sys
+import time
+import random
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from boxes import BoxSet
+from alignment import box_columns
+
+def dense_page (columns: int, per_column: int, seed: int = 0):
+    """
+    Character boxes of a page with columns of boxes 20 wide, one unit apart, in shuffled order
+    """
+    rnd = random.Random(seed)
+    points = []
+    for column in range(columns):
+        right = 1000 - column * 21
+        for row in range(per_column):
+            top = row * 21 + rnd.uniform(-1, 1)
+            left = right - 20 + rnd.uniform(-0.5, 0.5)
+            points.append([[left, top], [right, top], [right, top + 20], [left, top + 20]])
+    rnd.shuffle(points)
+
+    return BoxSet(np.array(points, dtype = float))
+
+def main ():
+    parser = argparse.ArgumentParser(description = "Time box_columns on dense pages")
+    parser.add_argument("--repeat", type = int, default = 3, help = "Best of this many runs")
+    args = parser.parse_args()
+
+    #! The time per box should stay flat as the columns grow
+    for columns, per_column in [(2, 2000), (2, 4000), (2, 8000), (100, 200)]:
+        boxes = dense_page(columns, per_column)
+        best = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            found = box_columns(boxes)
+            best = min(best, time.perf_counter() - start)
+
+        print(f"{columns:>3} columns x {per_column:>4} boxes: {best:.3f} s, "
+              f"{best / len(boxes) * 1e6:.1f} us per box, {len(found)} columns found")
+
+if __name__ == "__main__":
+    main()
@@ -1,105 +1,232 @@
-from levenstein import levenstein
+from heapq import heappush, heappop, heapify
+from bisect import bisect_left, bisect_right
+from boxes import BoxSet, IntervalIndex
+from levenstein import levenstein_pairs, levenstein_batch, levenstein_distance
 
-def sort_boxes_in_correct_order(boxes: list, concat = True):
+def next_remaining(order: list, position: int, removed):
     """
-    Sorts a list of boxes in the correct order by arranging them based on spatial 
-    positions (e.g., left-to-right, top-to-bottom). Optionally concatenates boxes 
-    that are vertically stacked.
+    Position of the first box of order, from position on, that is not removed.
+    """
+    while position < len(order) and order[position] in removed:
+        position += 1
+    return position
 
-    Args:
-        boxes (list): A list of box dictionaries, each containing 'points' (coordinates)
-                      and 'transcription' (text).
-        concat (bool): Whether to concatenate vertically stacked boxes.
+def merge_interval(starts: list, ends: list, low, high):
+    """
+    Adds the closed interval [low, high] to a sorted list of disjoint intervals,
+    merging it with the intervals it touches.
+    """
+    first = bisect_left(ends, low)
+    last = bisect_right(starts, high)
+    if first < last:
+        low = min(low, starts[first])
+        high = max(high, ends[last - 1])
+    starts[first:last] = [low]
+    ends[first:last] = [high]
+
+def covers_interval(starts: list, ends: list, low, high):
+    """
+    Whether the closed interval [low, high] lies within one of the sorted disjoint intervals.
+    """
+    position = bisect_right(starts, low) - 1
+    return position >= 0 and ends[position] >= high
+
+def collect_column(seed: int, index: IntervalIndex, lefts: list, rights: list):
+    """
+    Collects the boxes of the column of seed the way the pairwise scan did: two passes
+    over the boxes in input order, each one taking the boxes that overlap in x a box
+    already taken. Only the neighbours the index gives for each taken box are visited.
+
+    The boxes of the column are taken out of the index, a box is found at most once
+    per column and the boxes found but left out go back to the index at the end.
 
     Returns:
-        list: Sorted boxes, either as individual items or concatenated.
-    """
-    # Create a copy of the input boxes to avoid modifying the original list
-    boxes_copy = [box for box in boxes]
-    correct_boxes = []  # List to hold the correctly sorted boxes
-    num_boxes = len(boxes)  # Total number of boxes to process
-
-    # Main loop: Process all boxes until none are left
-    while num_boxes > 0:
-        # Initialize variables to identify the rightmost box
-        rightmost_box = None
-        box_index = None
-
-        # Identify the rightmost box in the current stack
-        for i in range(len(boxes_copy)):
-            more_right_box = None
-            for j in range(len(boxes_copy)):
-                if j != i:
-                    # Compare the x-coordinates of the boxes to find overlap
-                    if (max(boxes_copy[j]['points'][0][0], boxes_copy[j]['points'][3][0]) >= 
-                        min(boxes_copy[i]['points'][1][0], boxes_copy[i]['points'][2][0])):
-
-                        more_right_box = boxes_copy[j]
-                        break
-            
-            # If no box is found to the right, current box is the rightmost
-            if more_right_box is None:
-                rightmost_box = boxes_copy[i]
-                box_index = i
+        list: The indices of the column, in the order they were taken.
+    """
+    found = []
+    starts, ends = [], []
+
+    def neighbours(i):
+        if lefts[i] <= rights[i]:
+            # The boxes overlapping an interval already queried were taken by that query
+            if covers_interval(starts, ends, lefts[i], rights[i]):
+                return set()
+            near = index.take(lefts[i], rights[i])
+            merge_interval(starts, ends, lefts[i], rights[i])
+        else:
+            # A box with its left end past its right end only catches boxes covering one of its ends
+            near = index.take(lefts[i], lefts[i]) | index.take(rights[i], rights[i])
+        found.extend(near)
+        return near
+
+    index.remove(seed)
+    column = [seed]
+
+    # First pass: every box overlapping the seed, or a box taken before it in input order
+    first_pass = list(neighbours(seed))
+    heapify(first_pass)
+    second_pass = []
+    while first_pass:
+        i = heappop(first_pass)
+        column.append(i)
+        for j in neighbours(i):
+            # Boxes before i were passed already, they can only be taken by the second pass
+            heappush(first_pass if j > i else second_pass, j)
+
+    # Second pass: the boxes left, overlapping a box of the first pass or one taken before them
+    heapify(second_pass)
+    while second_pass:
+        i = heappop(second_pass)
+        column.append(i)
+        for j in neighbours(i):
+            if j > i:
+                heappush(second_pass, j)
+
+    # Boxes the second pass had passed already belong to a later column
+    taken = set(column)
+    for j in found:
+        if j not in taken:
+            index.add(j)
+
+    return column
+
+def column_rows(column: list, tops: list, bottoms: list, lefts: list):
+    """
+    Orders the boxes of a column top-to-bottom. Each row holds the boxes with no
+    remaining box fully above them, from right to left.
+
+    Returns:
+        list: The indices of the column in reading order.
+    """
+    by_top = sorted(column, key = lambda i: tops[i])
+    by_bottom = sorted(column, key = lambda i: bottoms[i])
+    column_order = {i: position for position, i in enumerate(column)}
+    done = set()
+    top_position = bottom_position = 0
+    ordered = []
+
+    while len(done) < len(column):
+        # The two highest bottoms bound the tops of the boxes of the next row
+        bottom_position = next_remaining(by_bottom, bottom_position, done)
+        lowest = by_bottom[bottom_position]
+        following = next_remaining(by_bottom, bottom_position + 1, done)
+        first_bottom = bottoms[lowest]
+        second_bottom = bottoms[by_bottom[following]] if following < len(by_bottom) else float('inf')
+
+        row = set()
+        top_position = next_remaining(by_top, top_position, done)
+        for position in range(top_position, len(by_top)):
+            i = by_top[position]
+            if i in done:
+                continue
+            if tops[i] < (second_bottom if i == lowest else first_bottom):
+                row.add(i)
+            elif i != lowest:
                 break
+        if tops[lowest] < second_bottom:
+            row.add(lowest)
 
-        # Collect all boxes that belong to the same vertical stack as the rightmost box
-        rightmost_boxes = [rightmost_box]
-        box_indices = [box_index]
-        for i in range(len(boxes_copy)):
-            if (i not in box_indices
-                and any(boxes_copy[i]['points'][0][0] <= rightmost_boxes[j]['points'][0][0] <= boxes_copy[i]['points'][1][0] 
-                        or boxes_copy[i]['points'][0][0] <= rightmost_boxes[j]['points'][1][0] <= boxes_copy[i]['points'][1][0] 
-                        or rightmost_boxes[j]['points'][0][0] <= boxes_copy[i]['points'][0][0] <= boxes_copy[i]['points'][1][0] <= rightmost_boxes[j]['points'][1][0] for j in range(len(rightmost_boxes)))):
-                
-                rightmost_boxes.append(boxes_copy[i])
-                box_indices.append(i)
-
-        # Repeat the above step to ensure no boxes are left out
-        for i in range(len(boxes_copy)):
-            if (i not in box_indices
-                and any(boxes_copy[i]['points'][0][0] <= rightmost_boxes[j]['points'][0][0] <= boxes_copy[i]['points'][1][0] 
-                        or boxes_copy[i]['points'][0][0] <= rightmost_boxes[j]['points'][1][0] <= boxes_copy[i]['points'][1][0] 
-                        or rightmost_boxes[j]['points'][0][0] <= boxes_copy[i]['points'][0][0] <= boxes_copy[i]['points'][1][0] <= rightmost_boxes[j]['points'][1][0] for j in range(len(rightmost_boxes)))):
-                
-                rightmost_boxes.append(boxes_copy[i])
-                box_indices.append(i)
-
-        # Sort the collected boxes vertically (top-to-bottom)
-        rightmost_boxes_copy = [box for box in rightmost_boxes]
-        num_rightmost_boxes = len(rightmost_boxes)
-        sorted_rightmost_boxes = []
-
-        # Sort the vertical stack of boxes
-        while num_rightmost_boxes > 0:
-            top_boxes = []  # Boxes at the top of the current stack
-            for i in range(len(rightmost_boxes_copy)):
-                more_top_box = None
-                for j in range(len(rightmost_boxes_copy)):
-                    if j != i:
-                        # Compare the y-coordinates to determine vertical positioning
-                        if (max(rightmost_boxes_copy[i]['points'][0][1], rightmost_boxes_copy[i]['points'][1][1]) >= 
-                            min(rightmost_boxes_copy[j]['points'][2][1], rightmost_boxes_copy[j]['points'][3][1])):
-                            more_top_box = rightmost_boxes_copy[j]
-                            break
-                
-                # If no box is found above, current box is at the top
-                if more_top_box is None:
-                    top_boxes.append(rightmost_boxes_copy[i])
+        # Boxes all lying above one another never form a row, keep them in column order
+        if not row:
+            row = set(column) - done
+
+        # Sort the row by x-coordinate, keeping the column order between equal ones
+        row = sorted(row, key = column_order.get)
+        ordered.extend(sorted(row, key = lambda i: lefts[i], reverse = True))
+        done.update(row)
+
+    return ordered
+
+def box_columns(boxes: BoxSet):
+    """
+    Finds the columns of a page, from right to left, and orders the boxes of each
+    column top-to-bottom.
+
+    Columns are seeded from the boxes sorted by x and grown through an interval index of
+    the page, and the boxes of a column are peeled row by row from sorted tops and bottoms,
+    so the work follows the number of neighbours of each box rather than the page size.
+
+    Args:
+        boxes (BoxSet): The boxes of the page.
+
+    Returns:
+        list: The columns, each as a list of box indices in reading order.
+    """
+    num_boxes = len(boxes)
+
+    # Interval ends used by the overlap tests, as lists for the scalar comparisons below
+    lefts = boxes.points[:, 0, 0].tolist()
+    rights = boxes.points[:, 1, 0].tolist()
+    left_edges = boxes.left_edges.tolist()
+    right_edges = boxes.right_edges.tolist()
+    tops = boxes.tops.tolist()
+    bottoms = boxes.bottoms.tolist()
 
-            # Sort the top boxes by their x-coordinates and add to the result
-            sorted_rightmost_boxes.extend(sorted(top_boxes, key = lambda x: x['points'][0][0], reverse = True))
-            num_rightmost_boxes -= len(top_boxes)
+    # Overlap queries only visit the boxes overlapping the queried interval
+    index = IntervalIndex(lefts, rights)
 
-            # Remove the identified top boxes from the list
-            rightmost_boxes_copy = [box for box in rightmost_boxes_copy if box not in top_boxes]
+    # A box is the rightmost one when no other box starts at or past its right edge,
+    # the first such box in input order seeds the next column
+    by_left_edge = sorted(range(num_boxes), key = lambda i: left_edges[i], reverse = True)
+    by_right_edge = sorted(range(num_boxes), key = lambda i: right_edges[i], reverse = True)
+    left_position = right_position = 0
+    candidates = []
+    removed = set()
+    columns = []
 
-        # Reduce the total count of boxes and store the sorted stack
-        num_boxes -= len(sorted_rightmost_boxes)
-        correct_boxes.append(sorted_rightmost_boxes)
+    while len(removed) < num_boxes:
+        # The largest left edge among the remaining boxes
+        left_position = next_remaining(by_left_edge, left_position, removed)
+        first = by_left_edge[left_position]
+        threshold = left_edges[first]
 
-        # Remove the processed boxes from the main list
-        boxes_copy = [box for box in boxes_copy if box not in sorted_rightmost_boxes]
+        # Boxes whose right edge is past it, the threshold only decreases as columns are removed
+        while right_position < num_boxes and right_edges[by_right_edge[right_position]] > threshold:
+            heappush(candidates, by_right_edge[right_position])
+            right_position += 1
+        while candidates and candidates[0] in removed:
+            heappop(candidates)
+        seed = candidates[0] if candidates else None
+
+        # The box with the largest left edge is only compared with the second largest one
+        if right_edges[first] <= threshold:
+            following = next_remaining(by_left_edge, left_position + 1, removed)
+            second = left_edges[by_left_edge[following]] if following < num_boxes else float('-inf')
+            if right_edges[first] > second and (seed is None or first < seed):
+                seed = first
+        if seed is None:
+            seed = first
+
+        # Collect the column and sort it vertically
+        column = collect_column(seed, index, lefts, rights)
+        columns.append(column_rows(column, tops, bottoms, lefts))
+        removed.update(column)
+
+    return columns
+
+def sort_boxes_in_correct_order(boxes, concat = True):
+    """
+    Sorts a list of boxes in the correct order by arranging them based on spatial
+    positions (e.g., right-to-left columns, top-to-bottom). Optionally concatenates boxes
+    that are vertically stacked.
+
+    Args:
+        boxes (BoxSet or list): The boxes, as a BoxSet or as a list of box dictionaries,
+                                each containing 'points' (coordinates) and 'transcription' (text).
+        concat (bool): Whether to concatenate vertically stacked boxes.
+
+    Returns:
+        BoxSet or list: For a BoxSet, the concatenated boxes as one BoxSet, or a list with
+                        the BoxSet of each column. For dictionaries, the sorted boxes, either
+                        as individual items or concatenated.
+    """
+    if isinstance(boxes, BoxSet):
+        columns = [boxes.take(column) for column in box_columns(boxes)]
+        if concat:
+            return BoxSet.concatenate([column.stack() for column in columns])
+        return columns
+
+    correct_boxes = [[boxes[i] for i in column] for column in box_columns(BoxSet.from_dicts(boxes))]
 
     # If concatenation is enabled, merge vertically stacked boxes
     if concat:
@@ -122,20 +249,23 @@ def sort_boxes_in_correct_order(boxes: list, concat = True):
     else:
         return correct_boxes
 
-def char_alignment(ocr_sino, QN, SinoNom_Similar_Dict, QN_SinoNom_Dict):
+def get_Sino_QN_equal(SinoNom_Similar_Dict, QN_SinoNom_Dict, dictionary = None):
     """
-    Aligns SinoNom characters from OCR text with QN words, using a custom similarity
-    function for matching.
+    Builds the function comparing a Sino word with a QN word.
 
     Args:
-        ocr_sino (str): OCR-detected SinoNom text.
-        QN (list): List of QN words for alignment.
         SinoNom_Similar_Dict (dict): Dictionary mapping Sino words to similar Sino words.
         QN_SinoNom_Dict (dict): Dictionary mapping QN words to similar Sino words.
+        dictionary (CompiledDictionary): Optional compiled form of both dictionaries, whose
+                                         match_code is used instead of building sets on each call.
 
     Returns:
-        tuple: A list of aligned Sino-QN pairs and a list of alignment marks.
+        function: Sino_QN_equal(Sino_word, QN_word), giving 1 for an exact match,
+                  2 for a partial match and 0 for no match.
     """
+    if dictionary is not None:
+        return dictionary.match_code
+
     # Helper function to compare a Sino word with a QN word
     def Sino_QN_equal(Sino_word, QN_word):
         # Get lists of similar words for Sino and QN
@@ -150,29 +280,292 @@ def char_alignment(ocr_sino, QN, SinoNom_Similar_Dict, QN_SinoNom_Dict):
             return 2  # Partial match
         return 0  # No match
 
-    # Convert OCR-detected SinoNom text into a list of characters
-    HN = [letter for letter in ocr_sino]
-    # Align OCR SinoNom characters with QN words using Levenshtein distance
-    aligned_HN, aligned_QN = levenstein(HN, QN, equal_function = Sino_QN_equal)
+    return Sino_QN_equal
+
+def mark_alignment(aligned_pairs, Sino_QN_equal):
+    """
+    Marks aligned Sino-QN pairs with color codes.
+
+    Args:
+        aligned_pairs (iterable): Aligned (Sino, QN, code) triples, "*" standing for a missing
+                                  element and code being the result of Sino_QN_equal for the pair,
+                                  or None when it was not computed.
+        Sino_QN_equal (function): Function comparing a Sino word with a QN word.
+
+    Returns:
+        tuple: A list of aligned Sino-QN pairs and a list of alignment marks.
+    """
     alignment = []  # Store aligned pairs
     marked = []  # Store alignment marks for visualization
 
     # Mark mismatches and matches with different color codes
-    for i in range(len(aligned_HN)):
-        if aligned_HN[i] != "*":  # Skip placeholders
-            if Sino_QN_equal(aligned_HN[i], aligned_QN[i]) == 0:
+    for sino, qn, code in aligned_pairs:
+        if sino != "*":  # Skip placeholders
+            if code is None:
+                code = Sino_QN_equal(sino, qn)
+            if code == 0:
                 marked.append('r')      #! Red: mismatch
-                if (aligned_QN[i] == "*"):
-                    alignment.append((aligned_HN[i], ""))
+                if (qn == "*"):
+                    alignment.append((sino, ""))
                 else:
-                    alignment.append((aligned_HN[i], aligned_QN[i]))
+                    alignment.append((sino, qn))
             else:
-                alignment.append((aligned_HN[i], aligned_QN[i]))
-                if Sino_QN_equal(aligned_HN[i], aligned_QN[i]) == 1:
+                alignment.append((sino, qn))
+                if code == 1:
                     marked.append('n')  # No color: exact match
                 else:
                     marked.append('b')  #? Blue: partial match
         else:
-            alignment.append(("", aligned_QN[i]))
+            alignment.append(("", qn))
+
+    return alignment, marked
+
+def find_anchors(HN, QN, QN_SinoNom_Dict):
+    """
+    Finds high-confidence anchors between SinoNom characters and QN words: pairs (i, j)
+    where HN[i] is an exact match of QN[j] and of no other QN word, and QN[j] is an exact
+    match of no other character. Only the longest chain increasing in both i and j is kept.
+
+    Args:
+        HN (list): List of SinoNom characters.
+        QN (list): List of QN words.
+        QN_SinoNom_Dict (dict): Dictionary mapping QN words to similar Sino words.
+
+    Returns:
+        list: Anchors (i, j), sorted by i and j.
+    """
+    # Positions of every SinoNom character
+    HN_positions = dict()
+    for i, letter in enumerate(HN):
+        HN_positions.setdefault(letter, []).append(i)
+
+    # Exact matches, found from the dictionary entries of each QN word
+    matches_of_HN = [[] for _ in HN]
+    matches_of_QN = [[] for _ in QN]
+    for j, QN_word in enumerate(QN):
+        for letter in set(QN_SinoNom_Dict.get(QN_word, [])):
+            for i in HN_positions.get(letter, []):
+                matches_of_HN[i].append(j)
+                matches_of_QN[j].append(i)
+
+    candidates = [(i, matches_of_HN[i][0]) for i in range(len(HN))
+                  if len(matches_of_HN[i]) == 1 and len(matches_of_QN[matches_of_HN[i][0]]) == 1]
+
+    # Longest chain with increasing QN positions (patience sorting)
+    tails = []          # Smallest QN position ending a chain of each length
+    tail_indices = []   # Candidate index of each tail
+    parents = [-1] * len(candidates)
+    for index, (_, j) in enumerate(candidates):
+        length = bisect_left(tails, j)
+        if length > 0:
+            parents[index] = tail_indices[length - 1]
+        if length == len(tails):
+            tails.append(j)
+            tail_indices.append(index)
+        else:
+            tails[length] = j
+            tail_indices[length] = index
+
+    anchors = []
+    index = tail_indices[-1] if tail_indices else -1
+    while index != -1:
+        anchors.append(candidates[index])
+        index = parents[index]
+    anchors.reverse()
+
+    return anchors
+
+def anchored_pairs(HN, QN, QN_SinoNom_Dict, Sino_QN_equal, engine = "numpy", max_cells = None):
+    """
+    Aligns SinoNom characters with QN words by fixing the anchors found by find_anchors,
+    then running the Levenshtein alignment only on the gaps between consecutive anchors.
+
+    Args:
+        HN (list): List of SinoNom characters.
+        QN (list): List of QN words.
+        QN_SinoNom_Dict (dict): Dictionary mapping QN words to similar Sino words.
+        Sino_QN_equal (function): Function comparing a Sino word with a QN word.
+        engine (str): Levenshtein engine used on the gaps.
+        max_cells (int): Gaps of more cells are aligned with the Hirschberg engine.
+
+    Yields:
+        tuple: Aligned (Sino, QN, code) triples as taken by mark_alignment.
+    """
+    if len(HN) == 0 or len(QN) == 0:
+        return
+
+    previous_i, previous_j = -1, -1
+    for i, j in find_anchors(HN, QN, QN_SinoNom_Dict) + [(len(HN), len(QN))]:
+        gap_HN = HN[previous_i + 1:i]
+        gap_QN = QN[previous_j + 1:j]
+
+        # A gap with one empty side only holds insertions or deletions
+        if len(gap_QN) == 0:
+            for letter in gap_HN:
+                yield letter, "*", None
+        elif len(gap_HN) == 0:
+            for QN_word in gap_QN:
+                yield "*", QN_word, None
+        else:
+            yield from levenstein_pairs(gap_HN, gap_QN, equal_function = Sino_QN_equal, engine = engine,
+                                        max_cells = max_cells, with_codes = True)
+
+        # Anchors are exact matches
+        if i < len(HN):
+            yield HN[i], QN[j], 1
+        previous_i, previous_j = i, j
+
+def char_alignment(ocr_sino, QN, SinoNom_Similar_Dict, QN_SinoNom_Dict, engine = "numpy", cache = None,
+                   anchored = False, dictionary = None, max_cells = None):
+    """
+    Aligns SinoNom characters from OCR text with QN words, using a custom similarity
+    function for matching.
+
+    Args:
+        ocr_sino (str): OCR-detected SinoNom text.
+        QN (list): List of QN words for alignment.
+        SinoNom_Similar_Dict (dict): Dictionary mapping Sino words to similar Sino words, a plain
+                                     dict or any DictionaryBackend (mapped file, SQLite).
+        QN_SinoNom_Dict (dict): Dictionary mapping QN words to similar Sino words, likewise.
+        engine (str): Levenshtein engine, "numpy" (vectorized), "bitparallel", "banded",
+                      "hirschberg" (low memory) or "python".
+        cache (AlignmentCache): Optional cache of previous results, new ones are committed
+                                by the caller (once per page in align_page).
+        anchored (bool): Whether to align only the gaps between unique exact matches (see
+                         anchored_pairs). This is close to linear on well-matched long texts,
+                         but may differ from the full alignment.
+        dictionary (CompiledDictionary): Optional compiled form of both dictionaries.
+        max_cells (int): Alignments of more cells switch to the Hirschberg engine, which keeps
+                         a few rows of costs instead of the whole matrix (MAX_TRACEBACK_CELLS by default).
+
+    Returns:
+        tuple: A list of aligned Sino-QN pairs and a list of alignment marks.
+    """
+    variant = "anchored" if anchored else None
+    if cache is not None:
+        cached = cache.get(ocr_sino, QN, variant = variant)
+        if cached is not None:
+            return cached
+
+    Sino_QN_equal = get_Sino_QN_equal(SinoNom_Similar_Dict, QN_SinoNom_Dict, dictionary = dictionary)
+
+    # Convert OCR-detected SinoNom text into a list of characters
+    HN = [letter for letter in ocr_sino]
+
+    # Align OCR SinoNom characters with QN words using Levenshtein distance
+    if anchored:
+        aligned_pairs = anchored_pairs(HN, QN, QN_SinoNom_Dict, Sino_QN_equal, engine = engine, max_cells = max_cells)
+    else:
+        aligned_pairs = levenstein_pairs(HN, QN, equal_function = Sino_QN_equal, engine = engine, max_cells = max_cells,
+                                         with_codes = True)
+    result = mark_alignment(aligned_pairs, Sino_QN_equal)
+
+    if cache is not None:
+        cache.put(ocr_sino, QN, result, variant = variant)
+
+    return result
+
+def char_alignment_batch(pairs, SinoNom_Similar_Dict, QN_SinoNom_Dict, cache = None, dictionary = None, max_cells = None):
+    """
+    Aligns many (OCR SinoNom text, QN words) pairs at once, e.g. all the sentences of a page,
+    with one stacked dynamic programming. Each result is the same as char_alignment gives.
+
+    Args:
+        pairs (list): List of (ocr_sino, QN) pairs, as taken by char_alignment.
+        SinoNom_Similar_Dict (dict): Dictionary mapping Sino words to similar Sino words.
+        QN_SinoNom_Dict (dict): Dictionary mapping QN words to similar Sino words.
+        cache (AlignmentCache): Optional cache of previous results, only the missing
+                                pairs are aligned and the caller commits the new ones.
+        dictionary (CompiledDictionary): Optional compiled form of both dictionaries.
+        max_cells (int): Cells of each stacked group; a pair of more cells on its own is aligned
+                         with the Hirschberg engine (MAX_TRACEBACK_CELLS by default).
+
+    Returns:
+        list: One (alignment, marked) tuple per pair.
+    """
+    results = [None] * len(pairs)
+    if cache is not None:
+        results = [cache.get(ocr_sino, QN) for ocr_sino, QN in pairs]
+    missing = [index for index in range(len(pairs)) if results[index] is None]
+    if not missing:
+        return results
+
+    Sino_QN_equal = get_Sino_QN_equal(SinoNom_Similar_Dict, QN_SinoNom_Dict, dictionary = dictionary)
+
+    # Align all missing pairs together, then mark each of them
+    aligned = levenstein_batch([([letter for letter in pairs[index][0]], pairs[index][1]) for index in missing],
+                               equal_function = Sino_QN_equal, max_cells = max_cells, with_codes = True)
+    for index, (aligned_HN, aligned_QN, codes) in zip(missing, aligned):
+        results[index] = mark_alignment(zip(aligned_HN, aligned_QN, codes), Sino_QN_equal)
+        if cache is not None:
+            cache.put(pairs[index][0], pairs[index][1], results[index])
+
+    return results
+
+def alignment_score(ocr_sino, QN, SinoNom_Similar_Dict, QN_SinoNom_Dict, upper_bound = None, dictionary = None):
+    """
+    Computes the Levenshtein distance of char_alignment without building the alignment,
+    a partial match counting as a match.
+
+    Args:
+        ocr_sino (str): OCR-detected SinoNom text.
+        QN (list): List of QN words.
+        SinoNom_Similar_Dict (dict): Dictionary mapping Sino words to similar Sino words.
+        QN_SinoNom_Dict (dict): Dictionary mapping QN words to similar Sino words.
+        upper_bound (int): Optional bound, any distance above it is returned as upper_bound + 1.
+        dictionary (CompiledDictionary): Optional compiled form of both dictionaries.
+
+    Returns:
+        int: The distance, 0 when every character matches a QN word.
+    """
+    Sino_QN_equal = get_Sino_QN_equal(SinoNom_Similar_Dict, QN_SinoNom_Dict, dictionary = dictionary)
+
+    return levenstein_distance([letter for letter in ocr_sino], QN, equal_function = Sino_QN_equal,
+                               upper_bound = upper_bound)
+
+def alignment_quality(ocr_sino, QN, SinoNom_Similar_Dict, QN_SinoNom_Dict, dictionary = None):
+    """
+    Rates how well OCR SinoNom text and QN words align, e.g. to check the alignment of a page.
+
+    Args:
+        ocr_sino (str): OCR-detected SinoNom text.
+        QN (list): List of QN words.
+        SinoNom_Similar_Dict (dict): Dictionary mapping Sino words to similar Sino words.
+        QN_SinoNom_Dict (dict): Dictionary mapping QN words to similar Sino words.
+        dictionary (CompiledDictionary): Optional compiled form of both dictionaries.
+
+    Returns:
+        float: Share of matched elements, from 0 (nothing matches) to 1 (everything matches).
+    """
+    total = len(ocr_sino) + len(QN)
+    if total == 0:
+        return 1.0
+
+    return 1 - alignment_score(ocr_sino, QN, SinoNom_Similar_Dict, QN_SinoNom_Dict, dictionary = dictionary) / total
+
+def best_pairing(ocr_sino, candidates, SinoNom_Similar_Dict, QN_SinoNom_Dict, dictionary = None):
+    """
+    Finds the candidate QN sentence aligning best with OCR SinoNom text, e.g. to pair a box
+    with a sentence. The best distance so far bounds the next ones, so bad candidates stop early.
+
+    Args:
+        ocr_sino (str): OCR-detected SinoNom text.
+        candidates (list): List of candidate QN sentences, each one a list of QN words.
+        SinoNom_Similar_Dict (dict): Dictionary mapping Sino words to similar Sino words.
+        QN_SinoNom_Dict (dict): Dictionary mapping QN words to similar Sino words.
+        dictionary (CompiledDictionary): Optional compiled form of both dictionaries.
+
+    Returns:
+        tuple: The index of the best candidate (the first one on ties, None without candidates)
+               and its distance.
+    """
+    Sino_QN_equal = get_Sino_QN_equal(SinoNom_Similar_Dict, QN_SinoNom_Dict, dictionary = dictionary)
+    HN = [letter for letter in ocr_sino]
+
+    best_index, best_distance = None, None
+    for index, QN in enumerate(candidates):
+        distance = levenstein_distance(HN, QN, equal_function = Sino_QN_equal, upper_bound = best_distance)
+        if best_distance is None or distance < best_distance:
+            best_index, best_distance = index, distance
 
-    return alignment, marked
\ No newline at end of file
+    return best_index, best_distance
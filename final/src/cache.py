@@ -0,0 +1,140 @@
+import os
+import json
+import pathlib
+import sqlite3
+import hashlib
+from collections import OrderedDict
+
+def files_fingerprint (paths: list):
+    """
+    Hash the content of a list of files, used to know whether the dictionaries changed
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        with open (path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                digest.update(chunk)
+
+    return digest.hexdigest()
+
+class AlignmentCache:
+    """
+    Cache of char_alignment results, keyed by the content of the (HN sentence, QN words) pair
+    A bounded in-memory LRU sits in front of an SQLite file that survives across runs
+    The file is emptied when the dictionary files it was built with change
+    """
+    def __init__ (self, path: str = None, dictionary_paths: list = (), max_entries: int = 100_000,
+                  read_only: bool = False):
+        self.memory = OrderedDict()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        #! Worker processes only read the file, their new results are handed to the process owning it
+        self.read_only = read_only
+        self.new_entries = []
+
+        #! Without a path, only the in-memory tier is used
+        self.connection = None
+        if (path is None):
+            return
+
+        if (read_only):
+            self.connection = sqlite3.connect(pathlib.Path(path).absolute().as_uri() + "?mode=ro", uri = True)
+            return
+
+        if (os.path.dirname(path) and not os.path.exists(os.path.dirname(path))):
+            os.makedirs(os.path.dirname(path))
+
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS alignments (key TEXT PRIMARY KEY, value TEXT)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+
+        #! Invalidate the stored results when the dictionaries changed
+        version = files_fingerprint(dictionary_paths)
+        stored = self.connection.execute("SELECT value FROM meta WHERE name = 'dictionaries'").fetchone()
+        if (stored is None or stored[0] != version):
+            self.connection.execute("DELETE FROM alignments")
+            self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('dictionaries', ?)", (version,))
+        self.connection.commit()
+
+    @staticmethod
+    def key (ocr_sino: str, QN: list, variant: str = None):
+        content = [ocr_sino, QN] if variant is None else [ocr_sino, QN, variant]
+        return hashlib.sha256(json.dumps(content, ensure_ascii = False).encode('utf-8')).hexdigest()
+
+    def remember (self, key: str, value: tuple):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        if (len(self.memory) > self.max_entries):
+            self.memory.popitem(last = False)
+
+    def get (self, ocr_sino: str, QN: list, variant: str = None):
+        """
+        Return the cached (alignment, marked) tuple of a pair, or None
+        The variant separates the results of alignment modes giving different outputs
+        """
+        key = self.key(ocr_sino, QN, variant)
+        if (key in self.memory):
+            self.hits += 1
+            self.memory.move_to_end(key)
+            return self.memory[key]
+
+        if (self.connection is not None):
+            row = self.connection.execute("SELECT value FROM alignments WHERE key = ?", (key,)).fetchone()
+            if (row is not None):
+                self.disk_hits += 1
+                alignment, marked = json.loads(row[0])
+                value = ([tuple(pair) for pair in alignment], marked)
+                self.remember(key, value)
+                return value
+
+        self.misses += 1
+        return None
+
+    def put (self, ocr_sino: str, QN: list, value: tuple, variant: str = None):
+        """
+        Store the (alignment, marked) tuple of a pair, call commit to write it to the file
+        """
+        key = self.key(ocr_sino, QN, variant)
+        self.remember(key, value)
+        if (self.connection is None):
+            return
+
+        if (self.read_only):
+            self.new_entries.append((key, json.dumps(value, ensure_ascii = False)))
+        else:
+            self.connection.execute("INSERT OR REPLACE INTO alignments VALUES (?, ?)",
+                                    (key, json.dumps(value, ensure_ascii = False)))
+
+    def take_new_entries (self):
+        """
+        The (key, value) rows put since the last call, for a read-only cache
+        """
+        entries = self.new_entries
+        self.new_entries = []
+        return entries
+
+    def add_entries (self, entries: list):
+        """
+        Store the rows taken from the read-only cache of another process
+        """
+        if (self.connection is not None and entries):
+            self.connection.executemany("INSERT OR REPLACE INTO alignments VALUES (?, ?)", entries)
+
+    def commit (self):
+        if (self.connection is not None and not self.read_only):
+            self.connection.commit()
+
+    def close (self):
+        if (self.connection is not None):
+            if (not self.read_only):
+                self.connection.commit()
+            self.connection.close()
+            self.connection = None
+
+    def report (self):
+        total = self.hits + self.disk_hits + self.misses
+        return (f"Alignment cache: {self.hits} memory hits, {self.disk_hits} disk hits, "
+                f"{self.misses} misses ({total} lookups)")
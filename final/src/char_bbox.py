@@ -1,11 +1,13 @@
 import os
-import torch
 from PIL import Image
 
 def load_model (repo_or_dir, optimizer_path):
     """
     
     """
+    #! Only detection needs torch, so it is not loaded when the module is imported for anything else
+    import torch
+    
     model = torch.hub.load(repo_or_dir = repo_or_dir, 
                            model = 'custom', 
                            path = optimizer_path)
@@ -83,6 +85,7 @@ def perform_extract_images_char_ocr (image_dir, model):
             #
             perform_extract_images_char_ocr(item_path, model)
             
-model = load_model(repo_or_dir = 'ultralytics/yolov5', optimizer_path = 'optimizer/best.pt')
-perform_extract_images_char_ocr(image_dir = "OCR_result/Prj_19_CLC_Thien Chua Thanh Mau q. thuong MAIORICA - AI",
-                                model = model)
\ No newline at end of file
+if __name__ == "__main__":
+    model = load_model(repo_or_dir = 'ultralytics/yolov5', optimizer_path = 'optimizer/best.pt')
+    perform_extract_images_char_ocr(image_dir = "OCR_result/Prj_19_CLC_Thien Chua Thanh Mau q. thuong MAIORICA - AI",
+                                    model = model)
\ No newline at end of file
@@ -0,0 +1,134 @@
+#
+import os
+import sys
+import json
+import argparse
+
+#! Each subcommand imports what it needs, so that alignment runs never load torch, requests or xlsxwriter
+
+def run_extract (args):
+    from extract_input import collect_inputs_from_midterm
+
+    dirs, _, _ = collect_inputs_from_midterm(input_dir = args.input_dir, save_dir = args.save_dir)
+    print(f"Extracted {len(dirs)} files to {args.save_dir}")
+
+def run_ocr (args):
+    from sentence_bbox import perform_extract_images_ocr
+
+    perform_extract_images_ocr(image_dir = args.image_dir, jobs = args.jobs)
+
+def run_detect (args):
+    from char_bbox import load_model, perform_extract_images_char_ocr
+
+    model = load_model(repo_or_dir = args.repo, optimizer_path = args.weights)
+    perform_extract_images_char_ocr(image_dir = args.image_dir, model = model)
+
+def run_align (args):
+    from main import iter_data, iter_records
+
+    pages = iter_data(input_dir = args.input_dir,
+                      save_dir = args.save_dir,
+                      Sino_sim_path = args.sino_sim,
+                      QN_Sino_path = args.qn_sino,
+                      cache_path = args.cache,
+                      workers = args.jobs,
+                      manifest_path = args.manifest or None,
+                      max_cells = args.max_cells)
+
+    #! The records are kept as JSON so that export can run on its own, written page by page
+    if (os.path.dirname(args.output) and not os.path.exists(os.path.dirname(args.output))):
+        os.makedirs(os.path.dirname(args.output))
+
+    def saved_records ():
+        # Same text as json.dump of the whole list
+        with open (args.output, 'w', encoding = 'utf-8') as file:
+            file.write("[")
+            for index, record in enumerate(iter_records(pages)):
+                file.write((", " if index else "") + json.dumps(record.to_list(), ensure_ascii = False))
+                yield record
+            file.write("]")
+
+    if (args.excel is not None):
+        from export import export_excel_file
+        export_excel_file(file_name = args.excel, data = saved_records(), constant_memory = True)
+    else:
+        for _ in saved_records():
+            pass
+
+def run_export (args):
+    from export import export_excel_file
+
+    with open (args.records, 'r', encoding = 'utf-8') as file:
+        char_data = json.load(file)
+
+    export_excel_file(file_name = args.output, data = char_data)
+
+def build_parser ():
+    parser = argparse.ArgumentParser(description = "SinoNom - Quoc Ngu alignment pipeline")
+    parser.add_argument("--jobs", type = int, default = 1,
+                        help = "Number of images (ocr) or pages (align) processed at the same time")
+    parser.add_argument("--profile", nargs = "?", const = "-", default = None, metavar = "PATH",
+                        help = "Profile the subcommand, the statistics are printed or written to PATH")
+    subparsers = parser.add_subparsers(dest = "command", required = True)
+
+    #
+    extract = subparsers.add_parser("extract", help = "Copy the midterm images and labels into save_dir")
+    extract.add_argument("--input-dir", default = "midterm_result")
+    extract.add_argument("--save-dir", default = "OCR_result")
+    extract.set_defaults(run = run_extract)
+
+    #
+    ocr = subparsers.add_parser("ocr", help = "Sentence boxes of the images with the CLC Online API")
+    ocr.add_argument("image_dir")
+    ocr.set_defaults(run = run_ocr)
+
+    #
+    detect = subparsers.add_parser("detect", help = "Character boxes of the images with the Yolov5 model")
+    detect.add_argument("image_dir")
+    detect.add_argument("--repo", default = "ultralytics/yolov5")
+    detect.add_argument("--weights", default = "optimizer/best.pt")
+    detect.set_defaults(run = run_detect)
+
+    #
+    align = subparsers.add_parser("align", help = "Align the characters of every page and save the records")
+    align.add_argument("--input-dir", default = "midterm_result")
+    align.add_argument("--save-dir", default = "OCR_result")
+    align.add_argument("--sino-sim", default = "dictionary/SinoNom_similar_Dic.xlsx")
+    align.add_argument("--qn-sino", default = "dictionary/QuocNgu_SinoNom_Dic.xlsx")
+    align.add_argument("--cache", default = "Output/alignment_cache.sqlite")
+    align.add_argument("--manifest", default = "Output/run_manifest.sqlite",
+                       help = "Records of the aligned pages, reused while their inputs are unchanged (empty to disable)")
+    align.add_argument("--max-cells", type = int, default = None,
+                       help = "Sentences of more alignment cells are aligned in low memory (Hirschberg)")
+    align.add_argument("--output", default = "Output/char_data.json")
+    align.add_argument("--excel", default = None, help = "Also export the records to this Excel file")
+    align.set_defaults(run = run_align)
+
+    #
+    export = subparsers.add_parser("export", help = "Export the records saved by align to an Excel file")
+    export.add_argument("--records", default = "Output/char_data.json")
+    export.add_argument("--output", default = "Output/Prj_19_CK.xlsx")
+    export.set_defaults(run = run_export)
+
+    return parser
+
+def main (argv = None):
+    args = build_parser().parse_args(argv)
+
+    if (args.profile is None):
+        args.run(args)
+        return
+
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.runcall(args.run, args)
+
+    if (args.profile == "-"):
+        pstats.Stats(profiler, stream = sys.stderr).sort_stats("cumulative").print_stats(30)
+    else:
+        profiler.dump_stats(args.profile)
+
+if __name__ == "__main__":
+    main()
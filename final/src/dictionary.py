@@ -1,55 +1,528 @@
-import pandas as pd
+import os
 import ast
+import mmap
+import json
+import struct
+import sqlite3
+import numpy as np
 from tqdm import tqdm
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from cache import files_fingerprint
+
+#! Read-only memory-mapped form of both dictionaries and of their compiled index, rebuilt when the
+#! Excel files change. It is the dictionary cache of get_dictionaries and is shared by worker processes
+MAPPED_DICTIONARY_NAME = "dictionaries.map"
+MAPPED_DICTIONARY_MAGIC = b"SNQNMAP2"
+
+#! Room left for the JSON header, so that new stamps of the same spreadsheets are written in place
+MAPPED_HEADER_SIZE = 1024
+
+#! Tables of the SQLite dictionary backend, in the order get_dictionaries returns the dictionaries
+SQLITE_DICTIONARY_TABLES = ("SinoNom_Similar", "QN_SinoNom")
 
 def get_dictionaries(Sino_sim_path = "SinoNom_similar_Dic.xlsx",
-                     QN_Sino_path = "QuocNgu_SinoNom_Dic.xlsx"):
+                     QN_Sino_path = "QuocNgu_SinoNom_Dic.xlsx",
+                     use_cache = True,
+                     compiled = False):
+    # The cache is the mapped file next to the Excel files, opening it reads no entry
+    # and the compiled index is only read when it is asked for
+    map_path = os.path.join(os.path.dirname(os.path.abspath(Sino_sim_path)), MAPPED_DICTIONARY_NAME)
+    sources = [Sino_sim_path, QN_Sino_path]
+
+    # Open the cache if it was built from the same spreadsheets
+    if use_cache:
+        dictionaries = open_mapped_dictionaries(map_path, sources, compiled = compiled)
+        if dictionaries is not None:
+            return tuple(dictionaries)
+
+    SinoNom_Similar_Dict, QN_SinoNom_Dict = read_dictionaries(Sino_sim_path, QN_Sino_path)
+    dictionary = CompiledDictionary(SinoNom_Similar_Dict, QN_SinoNom_Dict)
+    if use_cache:
+        #! The cache is only a speed-up, a read-only folder is fine
+        try:
+            write_mapped_dictionaries(map_path, sources, [SinoNom_Similar_Dict, QN_SinoNom_Dict], dictionary)
+        except OSError:
+            pass
+
+    if compiled:
+        return SinoNom_Similar_Dict, QN_SinoNom_Dict, dictionary
+    return SinoNom_Similar_Dict, QN_SinoNom_Dict
+
+def source_stamps(sources):
+    # Size and modification time of each source file, cheap to compare
+    stamps = []
+    for path in sources:
+        status = os.stat(path)
+        stamps.append([status.st_size, status.st_mtime_ns])
+    return stamps
+
+def sources_header(sources):
+    # What the compiled forms record about the spreadsheets they were built from
+    return {
+        'stamps': source_stamps(sources),
+        'hashes': [files_fingerprint([path]) for path in sources]
+    }
+
+def sources_unchanged(header, sources):
+    # Same sizes and times means same files, otherwise compare the content hashes
+    if header['stamps'] == source_stamps(sources):
+        return True
+    return header['hashes'] == [files_fingerprint([path]) for path in sources]
+
+def read_dictionaries(Sino_sim_path = "SinoNom_similar_Dic.xlsx",
+                      QN_Sino_path = "QuocNgu_SinoNom_Dic.xlsx"):
+    # pandas is only loaded when the cache has to be rebuilt
+    import pandas as pd
+
     # Load two Excel files into pandas DataFrames
     SinoNom_Similar_Dict_temp = pd.read_excel(Sino_sim_path)
     QN_SinoNom_Dict_temp = pd.read_excel(QN_Sino_path)
 
-    # Initialize a dictionary to store SinoNom character similarities
+    # Parse all similarity lists at once, each row gives a group: the input character and its top 20
+    groups = [[character] + ast.literal_eval(top_20) for character, top_20 in
+              zip(SinoNom_Similar_Dict_temp['Input Character'].tolist(),
+                  SinoNom_Similar_Dict_temp['Top 20 Similar Characters'].tolist())]
+
+    # Rows of the groups containing each character, characters in order of first appearance
+    group_rows = dict()
+    for row, group in enumerate(groups):
+        for letter in group:
+            group_rows.setdefault(letter, []).append(row)
+
+    # The entry of a character is its first group, followed by the new characters of its other groups
     SinoNom_Similar_Dict = dict()
-    for i in tqdm(range(len(SinoNom_Similar_Dict_temp)), desc = "Load Sino_Sim dictionary"):
-        #
-        top_20 = ast.literal_eval(SinoNom_Similar_Dict_temp['Top 20 Similar Characters'][i])
-        
-        # If the character does not already have an entry, create one with its top similar characters
-        if SinoNom_Similar_Dict.get(SinoNom_Similar_Dict_temp['Input Character'][i]) is None:
-            # Parse 'Top 20 Similar Characters' into a list and add it to the dictionary entry
-            SinoNom_Similar_Dict[SinoNom_Similar_Dict_temp['Input Character'][i]] = (
-                [SinoNom_Similar_Dict_temp['Input Character'][i]] + top_20
-            )
-        else:
-            # If the character already exists in the dictionary, append the similar characters to its list
-            SinoNom_Similar_Dict[SinoNom_Similar_Dict_temp['Input Character'][i]] += (
-                list(set(top_20) - set(SinoNom_Similar_Dict[SinoNom_Similar_Dict_temp['Input Character'][i]]))
-            )
-            
-        # Iterate through the list of top 20 similar characters
-        for letter in top_20:
-            # If the similar character does not have an entry, create one with the input character and its similar characters
-            if (SinoNom_Similar_Dict.get(letter) is None):
-                # Add the input character and its similar characters to the dictionary entry
-                SinoNom_Similar_Dict[letter] = (
-                    [SinoNom_Similar_Dict_temp['Input Character'][i]] + top_20
-                )
-            else:
-                # If the character already exists in the dictionary, update its list by adding unique characters
-                SinoNom_Similar_Dict[letter] += (
-                    list(set([SinoNom_Similar_Dict_temp['Input Character'][i]] + top_20) - 
-                         set(SinoNom_Similar_Dict[letter]))
-                )
+    for letter, rows in tqdm(group_rows.items(), desc = "Load Sino_Sim dictionary"):
+        similar = list(groups[rows[0]])
+        seen = set(similar)
+        for row in rows[1:]:
+            for other in groups[row]:
+                if other not in seen:
+                    seen.add(other)
+                    similar.append(other)
+        SinoNom_Similar_Dict[letter] = similar
 
     # Initialize a dictionary to store mappings from Quoc Ngu to SinoNom characters
     QN_SinoNom_Dict = dict()
-    for i in tqdm(range(len(QN_SinoNom_Dict_temp)), desc = "Load QN_Sino dictionary"):
-        # If the Quoc Ngu word does not have an entry, create one with its associated SinoNom character
-        if QN_SinoNom_Dict.get(QN_SinoNom_Dict_temp['QuocNgu'][i]) is None:
-            QN_SinoNom_Dict[QN_SinoNom_Dict_temp['QuocNgu'][i]] = [QN_SinoNom_Dict_temp['SinoNom'][i]]
-        else:
-            # If an entry already exists, append the SinoNom character to its list
-            QN_SinoNom_Dict[QN_SinoNom_Dict_temp['QuocNgu'][i]].append(QN_SinoNom_Dict_temp['SinoNom'][i])
+    for QN_word, Sino_word in tqdm(zip(QN_SinoNom_Dict_temp['QuocNgu'].tolist(), QN_SinoNom_Dict_temp['SinoNom'].tolist()),
+                                   total = len(QN_SinoNom_Dict_temp), desc = "Load QN_Sino dictionary"):
+        # Create the entry of the Quoc Ngu word on its first row, then append its SinoNom characters
+        QN_SinoNom_Dict.setdefault(QN_word, []).append(Sino_word)
 
     # Return both dictionaries
-    return SinoNom_Similar_Dict, QN_SinoNom_Dict
\ No newline at end of file
+    return SinoNom_Similar_Dict, QN_SinoNom_Dict
+
+class CompiledDictionary:
+    """
+    Both dictionaries compiled once for the comparisons of char_alignment
+    QN words and SinoNom characters are interned to integer IDs, and for each QN word it keeps
+    the set of characters matching it exactly (its entry) and the bitset of characters matching
+    it partially (a similar character is in its entry)
+    match_code gives the same codes as alignment.get_Sino_QN_equal with two membership tests
+    The index is stored with the mapped dictionaries (write_compiled_index) and read back by from_index
+    """
+    def __init__(self, SinoNom_Similar_Dict, QN_SinoNom_Dict):
+        self.SinoNom_Similar_Dict = SinoNom_Similar_Dict
+        self.QN_SinoNom_Dict = QN_SinoNom_Dict
+
+        # Intern QN words and the SinoNom characters they can be written with
+        self.Sino_ids = dict()
+        self.QN_ids = dict()
+        self.QN_matches = []
+        for QN_word, Sino_words in QN_SinoNom_Dict.items():
+            self.QN_ids[QN_word] = len(self.QN_matches)
+            self.QN_matches.append(frozenset(self.Sino_ids.setdefault(letter, len(self.Sino_ids))
+                                             for letter in Sino_words))
+        QN_letters = set(self.Sino_ids)
+
+        # Inverse index: for each character of a QN entry, the characters having it as a similar character
+        # Similar characters absent from every QN entry are left out since they can never match
+        Sino_ids = []
+        counts = []
+        targets = []
+        for Sino_word, similar in SinoNom_Similar_Dict.items():
+            common = QN_letters.intersection(similar)
+            Sino_ids.append(self.Sino_ids.setdefault(Sino_word, len(self.Sino_ids)))
+            counts.append(len(common))
+            targets.extend(map(self.Sino_ids.__getitem__, common))
+        sources = np.repeat(np.array(Sino_ids, dtype = np.int32), counts)
+        targets = np.array(targets, dtype = np.int32)
+        order = np.argsort(targets)
+        inverse_values = sources[order]
+        inverse_offsets = np.searchsorted(targets[order], np.arange(len(QN_letters) + 1))
+
+        # Partial matches of each QN word, one bit per SinoNom character
+        self.row_bytes = (len(self.Sino_ids) + 7) // 8
+        partials = np.zeros((len(self.QN_matches), self.row_bytes), dtype = np.uint8)
+        row = np.zeros(self.row_bytes * 8, dtype = bool)
+        for QN_id, matches in enumerate(self.QN_matches):
+            row.fill(False)
+            for letter_id in matches:
+                row[inverse_values[inverse_offsets[letter_id]:inverse_offsets[letter_id + 1]]] = True
+            partials[QN_id] = np.packbits(row, bitorder = 'little')
+        self.QN_partials = partials.tobytes()
+
+    @classmethod
+    def from_index(cls, SinoNom_Similar_Dict, QN_SinoNom_Dict, Sino_words, QN_words, QN_matches, row_bytes, QN_partials):
+        # The compiled form as read from its stored index, IDs being the positions of the words
+        # Words that are not strings were stored empty, they can never be compared
+        self = cls.__new__(cls)
+        self.SinoNom_Similar_Dict = SinoNom_Similar_Dict
+        self.QN_SinoNom_Dict = QN_SinoNom_Dict
+        self.Sino_ids = {letter: Sino_id for Sino_id, letter in enumerate(Sino_words) if letter}
+        self.QN_ids = {QN_word: QN_id for QN_id, QN_word in enumerate(QN_words) if QN_word}
+        self.QN_matches = QN_matches
+        self.row_bytes = row_bytes
+        self.QN_partials = QN_partials
+        return self
+
+    def match_code(self, Sino_word, QN_word):
+        # 1 for an exact match, 2 for a partial match and 0 for no match
+        QN_id = self.QN_ids.get(QN_word)
+        Sino_id = self.Sino_ids.get(Sino_word)
+        if QN_id is None or Sino_id is None:
+            return 0
+
+        if Sino_id in self.QN_matches[QN_id]:
+            return 1  # Exact match
+        if (self.QN_partials[QN_id * self.row_bytes + (Sino_id >> 3)] >> (Sino_id & 7)) & 1:
+            return 2  # Partial match
+        return 0  # No match
+
+def write_compiled_index(file, dictionary):
+    # Layout: counts, the Sino characters then the QN words in ID order joined by "\0", the uint64 offsets
+    # of the exact matches of each QN word into their int32 IDs, then the partial-match bitsets as they are
+    Sino_blob = "\0".join(letter if isinstance(letter, str) else "" for letter in dictionary.Sino_ids).encode('utf-8')
+    QN_blob = "\0".join(QN_word if isinstance(QN_word, str) else "" for QN_word in dictionary.QN_ids).encode('utf-8')
+    match_offsets = np.zeros(len(dictionary.QN_matches) + 1, dtype = '<u8')
+    match_offsets[1:] = np.cumsum([len(matches) for matches in dictionary.QN_matches])
+    match_ids = np.array([Sino_id for matches in dictionary.QN_matches for Sino_id in sorted(matches)], dtype = '<i4')
+
+    file.write(struct.pack('<QQQQQQ', len(dictionary.Sino_ids), len(dictionary.QN_ids), len(Sino_blob), len(QN_blob),
+                           len(match_ids), dictionary.row_bytes))
+    for blob in (Sino_blob, QN_blob, match_offsets.tobytes(), match_ids.tobytes()):
+        file.write(blob)
+        file.write(b"\0" * (-len(blob) % 8))
+    file.write(dictionary.QN_partials)
+
+def read_compiled_index(buffer, offset, SinoNom_Similar_Dict, QN_SinoNom_Dict):
+    # The CompiledDictionary of the index at offset, its partial-match bitsets stay in the mapped buffer
+    Sino_count, QN_count, Sino_length, QN_length, match_count, row_bytes = struct.unpack_from('<QQQQQQ', buffer, offset)
+    offset += 48
+    Sino_words = bytes(buffer[offset:offset + Sino_length]).decode('utf-8').split("\0")
+    offset += Sino_length + (-Sino_length % 8)
+    QN_words = bytes(buffer[offset:offset + QN_length]).decode('utf-8').split("\0")
+    offset += QN_length + (-QN_length % 8)
+    match_offsets = np.frombuffer(buffer, dtype = '<u8', count = QN_count + 1, offset = offset).tolist()
+    offset += 8 * (QN_count + 1)
+    match_ids = np.frombuffer(buffer, dtype = '<i4', count = match_count, offset = offset).tolist()
+    offset += 4 * match_count + (-4 * match_count % 8)
+    if len(Sino_words) != Sino_count or len(QN_words) != QN_count or offset + QN_count * row_bytes > len(buffer):
+        raise ValueError("Truncated compiled index")
+
+    QN_matches = [frozenset(match_ids[start:end]) for start, end in zip(match_offsets, match_offsets[1:])]
+    QN_partials = memoryview(buffer)[offset:offset + QN_count * row_bytes]
+    return CompiledDictionary.from_index(SinoNom_Similar_Dict, QN_SinoNom_Dict, Sino_words, QN_words, QN_matches,
+                                         row_bytes, QN_partials)
+
+def get_mapped_dictionaries(Sino_sim_path = "SinoNom_similar_Dic.xlsx",
+                            QN_Sino_path = "QuocNgu_SinoNom_Dic.xlsx",
+                            loaded = None,
+                            compiled = False):
+    # The mapped file sits next to the Excel files, it is written again when they change
+    # from the (SinoNom_Similar_Dict, QN_SinoNom_Dict) already loaded, if given
+    map_path = os.path.join(os.path.dirname(os.path.abspath(Sino_sim_path)), MAPPED_DICTIONARY_NAME)
+    sources = [Sino_sim_path, QN_Sino_path]
+
+    dictionaries = open_mapped_dictionaries(map_path, sources, compiled = compiled)
+    if dictionaries is None:
+        if loaded is None:
+            loaded = get_dictionaries(Sino_sim_path, QN_Sino_path, compiled = True)
+        dictionary = loaded[2] if len(loaded) > 2 and loaded[2] is not None else CompiledDictionary(*loaded[:2])
+        write_mapped_dictionaries(map_path, sources, list(loaded[:2]), dictionary)
+        dictionaries = open_mapped_dictionaries(map_path, sources, compiled = compiled)
+
+    # SinoNom_Similar_Dict, QN_SinoNom_Dict, and the CompiledDictionary with compiled
+    return dictionaries
+
+def write_mapped_dictionaries(map_path, sources, dictionaries, compiled_dictionary):
+    # Layout: magic, JSON header with the source stamps and hashes, one section per dictionary, then the
+    # compiled index of both (write_compiled_index)
+    # A section holds the sorted UTF-8 keys and their values joined by "\0", with uint64 offsets into both
+    header = json.dumps(sources_header(sources)).encode('utf-8')
+    header += b" " * (max(MAPPED_HEADER_SIZE - len(header), 0) + (-len(header) % 8))
+
+    temporary_path = map_path + ".tmp"
+    with open(temporary_path, 'wb') as file:
+        file.write(MAPPED_DICTIONARY_MAGIC)
+        file.write(struct.pack('<Q', len(header)))
+        file.write(header)
+
+        for dictionary in dictionaries:
+            # Only string keys and values can be looked up, empty cells read as NaN are left out
+            entries = sorted((key.encode('utf-8'), "\0".join(value for value in values if isinstance(value, str)))
+                             for key, values in dictionary.items() if isinstance(key, str))
+            keys = [key for key, _ in entries]
+            values = [value.encode('utf-8') for _, value in entries]
+            key_offsets = np.zeros(len(keys) + 1, dtype = '<u8')
+            key_offsets[1:] = np.cumsum([len(key) for key in keys])
+            value_offsets = np.zeros(len(values) + 1, dtype = '<u8')
+            value_offsets[1:] = np.cumsum([len(value) for value in values])
+
+            key_blob = b"".join(keys)
+            value_blob = b"".join(values)
+            file.write(struct.pack('<QQQ', len(keys), len(key_blob), len(value_blob)))
+            file.write(key_offsets.tobytes())
+            file.write(value_offsets.tobytes())
+            file.write(key_blob)
+            file.write(value_blob)
+            file.write(b"\0" * (-(len(key_blob) + len(value_blob)) % 8))
+
+        write_compiled_index(file, compiled_dictionary)
+
+    # Processes that already mapped the old file keep reading it
+    os.replace(temporary_path, map_path)
+
+def open_mapped_dictionaries(map_path, sources, compiled = False):
+    # Return the MappedDictionary of both sections, followed with compiled by the CompiledDictionary
+    # of the index, or None when the file is missing or outdated
+    if not os.path.exists(map_path):
+        return None
+    try:
+        with open(map_path, 'rb') as file:
+            buffer = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+        if buffer[:8] != MAPPED_DICTIONARY_MAGIC:
+            return None
+
+        (header_length,) = struct.unpack_from('<Q', buffer, 8)
+        header = json.loads(bytes(buffer[16:16 + header_length]))
+        if header['stamps'] != source_stamps(sources):
+            if not sources_unchanged(header, sources):
+                return None
+            #! Touched but unchanged spreadsheets: record their new stamps so that later runs skip the hashes
+            restamp_mapped_header(map_path, header, sources, header_length)
+
+        dictionaries = []
+        offset = 16 + header_length
+        for _ in range(2):
+            dictionary = MappedDictionary(buffer, offset)
+            dictionaries.append(dictionary)
+            offset = dictionary.end
+        if compiled:
+            dictionaries.append(read_compiled_index(buffer, offset, *dictionaries))
+        return dictionaries
+    except (OSError, ValueError, KeyError, struct.error):
+        return None
+
+def restamp_mapped_header(map_path, header, sources, header_length):
+    # Write the header again in the room it was given, the sections that follow do not move
+    header = dict(header, stamps = source_stamps(sources))
+    content = json.dumps(header).encode('utf-8')
+    if len(content) > header_length:
+        return
+    try:
+        with open(map_path, 'r+b') as file:
+            file.seek(16)
+            file.write(content + b" " * (header_length - len(content)))
+    except OSError:
+        pass
+
+class DictionaryBackend(ABC):
+    """
+    Interface of the dictionaries taken by char_alignment, from SinoNom characters or QN words
+    to lists of SinoNom characters: read-only mapping access through get, [], in, len, keys and items
+    Plain dicts fit it as they are; subclasses implement lookup, keys and __len__ and get a bounded
+    LRU of the values they looked up, a subclass missing one of them cannot be instantiated
+    """
+    def __init__(self, cache_size = 4096):
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+
+    @abstractmethod
+    def lookup(self, key):
+        # The list of values of the key, or None when it is absent
+        ...
+
+    @abstractmethod
+    def keys(self):
+        ...
+
+    @abstractmethod
+    def __len__(self):
+        ...
+
+    def get(self, key, default = None):
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        values = self.lookup(key)
+        if values is None:
+            return default
+        self.cache[key] = values
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last = False)
+        return values
+
+    def __getitem__(self, key):
+        values = self.get(key)
+        if values is None:
+            raise KeyError(key)
+        return values
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def items(self):
+        for key in self.keys():
+            yield key, self.lookup(key)
+
+class MappedDictionary(DictionaryBackend):
+    """
+    Dictionary backend reading one section of a memory-mapped file written by write_mapped_dictionaries
+    Keys are found by binary search on the sorted keys, so opening costs nothing and processes
+    mapping the same file share its pages
+    """
+    def __init__(self, buffer, offset, cache_size = 4096):
+        super().__init__(cache_size = cache_size)
+        self.buffer = buffer
+        self.size, key_length, value_length = struct.unpack_from('<QQQ', buffer, offset)
+        offset += 24
+        self.key_offsets = np.frombuffer(buffer, dtype = '<u8', count = self.size + 1, offset = offset)
+        offset += 8 * (self.size + 1)
+        self.value_offsets = np.frombuffer(buffer, dtype = '<u8', count = self.size + 1, offset = offset)
+        offset += 8 * (self.size + 1)
+        self.key_start = offset
+        self.value_start = offset + key_length
+        self.end = self.value_start + value_length + (-(key_length + value_length) % 8)
+
+    def key_at(self, index):
+        return self.buffer[self.key_start + int(self.key_offsets[index]):self.key_start + int(self.key_offsets[index + 1])]
+
+    def values_at(self, index):
+        values = self.buffer[self.value_start + int(self.value_offsets[index]):
+                             self.value_start + int(self.value_offsets[index + 1])]
+        return values.decode('utf-8').split("\0") if values else []
+
+    def find(self, key):
+        # Index of the key, or -1 when it is absent
+        if not isinstance(key, str):
+            return -1
+        encoded = key.encode('utf-8')
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self.key_at(middle) < encoded:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.size and self.key_at(low) == encoded:
+            return low
+        return -1
+
+    def lookup(self, key):
+        index = self.find(key)
+        return None if index == -1 else self.values_at(index)
+
+    def __len__(self):
+        return self.size
+
+    def keys(self):
+        for index in range(self.size):
+            yield self.key_at(index).decode('utf-8')
+
+    def items(self):
+        for index in range(self.size):
+            yield self.key_at(index).decode('utf-8'), self.values_at(index)
+
+def get_sqlite_dictionaries(database_path, Sino_sim_path = None, QN_Sino_path = None, cache_size = 4096):
+    # With the spreadsheets, the database is written again when they change
+    # Without them, the database is used as it is, e.g. a large lexicon filled by another tool
+    if Sino_sim_path is not None and QN_Sino_path is not None:
+        sources = [Sino_sim_path, QN_Sino_path]
+        if not sqlite_dictionaries_unchanged(database_path, sources):
+            SinoNom_Similar_Dict, QN_SinoNom_Dict = get_dictionaries(Sino_sim_path, QN_Sino_path)
+            write_sqlite_dictionaries(database_path, sources, [SinoNom_Similar_Dict, QN_SinoNom_Dict])
+
+    # SinoNom_Similar_Dict, QN_SinoNom_Dict
+    return [SQLiteDictionary(database_path, table, cache_size = cache_size) for table in SQLITE_DICTIONARY_TABLES]
+
+def sqlite_dictionaries_unchanged(database_path, sources):
+    if not os.path.exists(database_path):
+        return False
+    connection = sqlite3.connect(database_path)
+    try:
+        row = connection.execute("SELECT value FROM meta WHERE name = 'sources'").fetchone()
+        if row is None:
+            return False
+        header = json.loads(row[0])
+        if header['stamps'] == source_stamps(sources):
+            return True
+        if not sources_unchanged(header, sources):
+            return False
+
+        #! Record the new stamps of touched but unchanged spreadsheets, as the mapped file does
+        header['stamps'] = source_stamps(sources)
+        try:
+            connection.execute("UPDATE meta SET value = ? WHERE name = 'sources'", (json.dumps(header),))
+            connection.commit()
+        except sqlite3.Error:
+            pass
+        return True
+    except sqlite3.Error:
+        return False
+    finally:
+        connection.close()
+
+def write_sqlite_dictionaries(database_path, sources, dictionaries):
+    # One table per dictionary, keyed by the character or word, values stored as JSON lists
+    temporary_path = database_path + ".tmp"
+    if os.path.exists(temporary_path):
+        os.remove(temporary_path)
+
+    connection = sqlite3.connect(temporary_path)
+    connection.execute("CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT)")
+    for table, dictionary in zip(SQLITE_DICTIONARY_TABLES, dictionaries):
+        connection.execute(f"CREATE TABLE {table} (key TEXT PRIMARY KEY, value TEXT)")
+        connection.executemany(f"INSERT INTO {table} VALUES (?, ?)",
+                               ((key, json.dumps([value for value in values if isinstance(value, str)],
+                                                 ensure_ascii = False))
+                                for key, values in dictionary.items() if isinstance(key, str)))
+    connection.execute("INSERT INTO meta VALUES ('sources', ?)", (json.dumps(sources_header(sources)),))
+    connection.commit()
+    connection.close()
+
+    os.replace(temporary_path, database_path)
+
+class SQLiteDictionary(DictionaryBackend):
+    """
+    Dictionary backend reading one table of an SQLite database, for lexicons too large to hold in memory
+    Each lookup is one query on the primary key index
+    """
+    def __init__(self, database_path, table, cache_size = 4096):
+        super().__init__(cache_size = cache_size)
+        self.connection = sqlite3.connect(database_path)
+        self.table = table
+
+    def lookup(self, key):
+        if not isinstance(key, str):
+            return None
+        row = self.connection.execute(f"SELECT value FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def __len__(self):
+        return self.connection.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def keys(self):
+        for (key,) in self.connection.execute(f"SELECT key FROM {self.table} ORDER BY key"):
+            yield key
+
+    def items(self):
+        for key, value in self.connection.execute(f"SELECT key, value FROM {self.table} ORDER BY key"):
+            yield key, json.loads(value)
+
+    def close(self):
+        self.connection.close()
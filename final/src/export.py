@@ -1,8 +1,17 @@
-from xlsxwriter.workbook import Workbook
+from records import CharRecord
 
-def export_excel_file(file_name, data):
+def export_excel_file(file_name, data, constant_memory = False):
+    """
+    Write the char records to an Excel file, data can be any iterable of records so that
+    the rows are written as the pages are aligned
+    The records are CharRecord objects, formatted here, or the nested lists of the JSON files
+    With constant_memory, each row is flushed to disk once written instead of being kept until the end
+    """
+    # xlsxwriter is only loaded when exporting
+    from xlsxwriter.workbook import Workbook
+    
     # Create a new workbook and add a worksheet to it
-    workbook = Workbook(file_name)
+    workbook = Workbook(file_name, {'constant_memory': constant_memory})
     worksheet = workbook.add_worksheet()
     
     # Define formatting for text in red, green, and with the 'Nom Na Tong' font
@@ -11,13 +20,9 @@ def export_excel_file(file_name, data):
     nom_na_tong = workbook.add_format({'font_name': 'Nom Na Tong'})
     green = workbook.add_format({'color': 'green', 'font_name': 'Nom Na Tong'})
     
-    # Set the width for each column to improve readability
-    worksheet.set_column('A:A', max(max(len(data[index][0]) for index in range (len(data))), 2) * 1.2)
-    worksheet.set_column('B:B', max(max(len(data[index][1]) for index in range (len(data))), 10) * 1.2)
-    worksheet.set_column('C:C', max(max(len(data[index][2][0]) for index in range (len(data))), 9) * 0.9)
-    worksheet.set_column('D:D', max(max(len(data[index][3][0]) for index in range (len(data))), 12) * 1.5)
-    if (len(data[0]) >= 5):
-        worksheet.set_column('E:E', max(max(len(data[index][4]) for index in range (len(data)) if len(data[index]) >= 5), 12) * 1.2)
+    # Widest entry of each column, the widths are set once every row is written
+    widths = [2, 10, 9, 12, 12]
+    has_QN = None
     
     # Write the column headers to the first row with the 'Nom Na Tong' font
     columns = ["Image_name", "ID", "Image Box", "SinoNom OCR", "Chữ Quốc Ngữ"]
@@ -28,26 +33,39 @@ def export_excel_file(file_name, data):
     num_Ins = 0
     num_Del = 0
     # Iterate over the data rows to write each row to the worksheet
-    for i in range(len(data)):
+    for i, record in enumerate(data):
+        if (isinstance(record, CharRecord)):
+            record = record.to_list()
+        
+        # Track the widest entry of each column
+        widths[0] = max(widths[0], len(record[0]))
+        widths[1] = max(widths[1], len(record[1]))
+        widths[2] = max(widths[2], len(record[2][0]))
+        widths[3] = max(widths[3], len(record[3][0]))
+        if (has_QN is None):
+            has_QN = len(record) >= 5
+        if (len(record) >= 5):
+            widths[4] = max(widths[4], len(record[4]))
+        
         # Write the ID column with 'Nom Na Tong' font
-        worksheet.write(i + 1, 0, data[i][0], nom_na_tong)
-        worksheet.write(i + 1, 1, data[i][1], nom_na_tong)
+        worksheet.write(i + 1, 0, record[0], nom_na_tong)
+        worksheet.write(i + 1, 1, record[1], nom_na_tong)
         
         # Write SinoNom Char and Chữ Quốc Ngữ data if present in the row
-        if len(data[i]) >= 5:
-            worksheet.write(i + 1, 4, data[i][4], nom_na_tong)
+        if len(record) >= 5:
+            worksheet.write(i + 1, 4, record[4], nom_na_tong)
         
-        if (data[i][2][0]):
+        if (record[2][0]):
             # Initialize a list for Image Box format and text elements
             format = []
             # Apply green formatting if specified, otherwise use the default format
-            if data[i][2][1] == 'g':
+            if record[2][1] == 'g':
                 num_Del += 1
-                for j in range(len(data[i][2][0])):
-                    format.extend((green, data[i][2][0][j]))
+                for j in range(len(record[2][0])):
+                    format.extend((green, record[2][0][j]))
             else:
-                for j in range(len(data[i][2][0])):
-                    format.extend(data[i][2][0][j])
+                for j in range(len(record[2][0])):
+                    format.extend(record[2][0][j])
             # Write the Image Box column with rich text formatting
             worksheet.write_rich_string(i + 1, 2, *format, nom_na_tong)
         else:
@@ -55,8 +73,8 @@ def export_excel_file(file_name, data):
         
         # Initialize a list for SinoNom OCR format and text elements
         format = []
-        sino_ocr = data[i][3][0]
-        marked = data[i][3][1]
+        sino_ocr = record[3][0]
+        marked = record[3][1]
         if marked:
             # Apply red formatting to marked characters
             for j in range(len(sino_ocr)):
@@ -86,6 +104,14 @@ def export_excel_file(file_name, data):
             # Write SinoNom OCR without formatting if no marking is specified
             worksheet.write(i + 1, 3, sino_ocr, nom_na_tong)
             
+    # Set the width for each column to improve readability
+    worksheet.set_column('A:A', widths[0] * 1.2)
+    worksheet.set_column('B:B', widths[1] * 1.2)
+    worksheet.set_column('C:C', widths[2] * 0.9)
+    worksheet.set_column('D:D', widths[3] * 1.5)
+    if (has_QN):
+        worksheet.set_column('E:E', widths[4] * 1.2)
+    
     # Close the workbook to save the Excel file
     workbook.close()
     
@@ -1,11 +1,13 @@
 import os
 import shutil
-import pandas as pd
 
 def read_Sino_QN (excel_file_path: str):
     """
     
     """
+    #! pandas is only loaded when the Excel files are read
+    import pandas as pd
+    
     try:
         #
         data = pd.read_excel(excel_file_path) 
@@ -120,6 +122,24 @@ def check_input_dir (input_dir: str):
         
     return False
 
+def write_if_changed (file_path: str, text: str):
+    """
+    Write text to a file unless it already holds it, so that an unchanged label file keeps
+    its modification time and the sidecar read_label_boxes built from it stays valid
+    """
+    #
+    content = text.replace('\n', os.linesep).encode('utf-8')
+    if (os.path.isfile(file_path)):
+        with open (file_path, 'rb') as file:
+            if (file.read() == content):
+                return False
+    
+    #
+    with open (file_path, 'w', encoding = 'utf-8') as file:
+        file.write(text)
+    
+    return True
+
 def collect_cleaned_inputs (input_dir: str, save_dir: str = None):
     """
     
@@ -177,8 +197,7 @@ def collect_cleaned_inputs (input_dir: str, save_dir: str = None):
                     
                 #
                 label_file = os.path.join(image, "image1_label.txt")
-                with open (label_file, 'w', encoding = 'utf-8') as file:
-                    file.write(labels[index][1])
+                write_if_changed(label_file, labels[index][1])
                     
                 index += 1
                     
@@ -0,0 +1,135 @@
+import os
+import re
+import ast
+import json
+import struct
+import numpy as np
+
+from boxes import BoxSet
+
+#! Binary sidecar written next to each label file, read instead of the label file while it is unchanged
+LABEL_SIDECAR_SUFFIX = ".boxes"
+LABEL_SIDECAR_MAGIC = b"SNLABEL1"
+
+#! Magic, size and modification time of the label file, number of boxes, length of the text blob, point type
+LABEL_SIDECAR_HEADER = struct.Struct('<8sQqQQc7x')
+
+#! One box of str(ocr_data), as sentence_bbox writes the label files
+LABEL_BOX_PATTERN = re.compile(r"""\{'transcription': ('[^'\\\n]*(?:\\.[^'\\\n]*)*'|"[^"\\\n]*(?:\\.[^"\\\n]*)*"), """
+                               r"""'points': (\[[-+0-9.eE,\s\[\]]*\])\}""")
+
+def parse_transcription(literal: str):
+    # Only the literals with escapes (\U for the characters outside the BMP, \' ...) need decoding
+    if "\\" not in literal:
+        return literal[1:-1]
+    return ast.literal_eval(literal)
+
+def parse_label_line(line: str):
+    """
+    Parse one line of a label file into its list of {"transcription", "points"} dicts
+    The lines are either str(ocr_data) from sentence_bbox, or JSON from the Label.txt of the midterm results
+    """
+    line = line.strip()
+    if not line:
+        return []
+
+    # Without escapes or double quotes, every string of str(ocr_data) is single-quoted and
+    # swapping the quotes gives JSON, read in one go
+    if "\\" not in line and '"' not in line:
+        try:
+            return json.loads(line.replace("'", '"'))
+        except ValueError:
+            pass
+
+    # Otherwise the transcriptions are read as Python literals, the points are valid JSON
+    transcriptions, points = [], []
+    position = 1
+    while line.startswith("{'transcription'", position):
+        match = LABEL_BOX_PATTERN.match(line, position)
+        if match is None:
+            break
+        transcriptions.append(match.group(1))
+        points.append(match.group(2))
+        position = match.end() + 2 if line.startswith(", ", match.end()) else match.end()
+
+    if position == len(line) - 1 and line[0] == "[" and line[-1] == "]" and not line.endswith(", ]"):
+        return [{"transcription": parse_transcription(transcription), "points": box_points}
+                for transcription, box_points in zip(transcriptions, json.loads("[" + ",".join(points) + "]"))]
+
+    try:
+        return json.loads(line)
+    except ValueError:
+        return ast.literal_eval(line)
+
+def label_stamp(label_path: str):
+    # Size and modification time of the label file, cheap to compare
+    status = os.stat(label_path)
+    return status.st_size, status.st_mtime_ns
+
+def write_label_sidecar(sidecar_path: str, stamp: tuple, boxes: BoxSet):
+    # Layout: header, the (N, 4, 2) points, the uint64 offsets of the transcriptions, then their UTF-8 blob
+    texts = [transcription.encode('utf-8') for transcription in boxes.transcriptions]
+    offsets = np.zeros(len(texts) + 1, dtype = '<u8')
+    offsets[1:] = np.cumsum([len(text) for text in texts])
+    blob = b"".join(texts)
+    kind = b'i' if boxes.points.dtype.kind in "iu" else b'f'
+
+    temporary_path = sidecar_path + ".tmp"
+    with open(temporary_path, 'wb') as file:
+        file.write(LABEL_SIDECAR_HEADER.pack(LABEL_SIDECAR_MAGIC, stamp[0], stamp[1], len(boxes), len(blob), kind))
+        file.write(boxes.points.astype('<i8' if kind == b'i' else '<f8').tobytes())
+        file.write(offsets.tobytes())
+        file.write(blob)
+    os.replace(temporary_path, sidecar_path)
+
+def load_label_sidecar(sidecar_path: str, stamp: tuple):
+    # Return the boxes of the sidecar, or None when it is missing, unreadable or outdated
+    if not os.path.exists(sidecar_path):
+        return None
+    try:
+        with open(sidecar_path, 'rb') as file:
+            data = file.read()
+
+        magic, size, mtime, count, blob_length, kind = LABEL_SIDECAR_HEADER.unpack_from(data)
+        if magic != LABEL_SIDECAR_MAGIC or (size, mtime) != stamp:
+            return None
+
+        offset = LABEL_SIDECAR_HEADER.size
+        points = np.frombuffer(data, dtype = '<i8' if kind == b'i' else '<f8', count = count * 8, offset = offset)
+        offset += points.nbytes
+        offsets = np.frombuffer(data, dtype = '<u8', count = count + 1, offset = offset).tolist()
+        offset += (count + 1) * 8
+        blob = data[offset:offset + blob_length]
+        if len(blob) != blob_length:
+            return None
+
+        transcriptions = [blob[start:end].decode('utf-8') for start, end in zip(offsets, offsets[1:])]
+        return BoxSet(points.astype(np.int64 if kind == b'i' else float), transcriptions)
+    except (OSError, ValueError, struct.error):
+        return None
+
+def read_label_boxes(label_path: str, use_sidecar: bool = True):
+    """
+    Read the sentence boxes of a label file as a BoxSet
+    The first read writes a binary sidecar next to the label file, later reads load it while
+    the label file keeps the same size and modification time
+    """
+    stamp = label_stamp(label_path)
+    sidecar_path = label_path + LABEL_SIDECAR_SUFFIX
+    if use_sidecar:
+        boxes = load_label_sidecar(sidecar_path, stamp)
+        if boxes is not None:
+            return boxes
+
+    #
+    with open(label_path, "r", encoding = "utf-8") as file:
+        boxes = BoxSet.from_dicts([box for line in file for box in parse_label_line(line)])
+
+    #! The sidecar is only a speed-up, a read-only folder is fine
+    if use_sidecar:
+        try:
+            write_label_sidecar(sidecar_path, stamp, boxes)
+        except OSError:
+            pass
+
+    return boxes
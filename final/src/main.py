@@ -1,38 +1,309 @@
 #
 import os
 import re
-import json
+import multiprocessing
 
 #
 from extract_input import collect_inputs_from_midterm
-from dictionary import get_dictionaries
+from dictionary import get_dictionaries, get_mapped_dictionaries
+from cache import AlignmentCache
+from manifest import RunManifest
 
 #
-from alignment import sort_boxes_in_correct_order, char_alignment
+from alignment import sort_boxes_in_correct_order, char_alignment_batch
 
 #
 from export import export_excel_file
 
 #
+from boxes import BoxSet
+from labels import read_label_boxes
+from records import CharRecord
+
+#
+import numpy as np
 from tqdm import tqdm
+from itertools import islice
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Future
 
-def get_data(input_dir: str,
-             save_dir: str,
-             Sino_sim_path: str = "SinoNom_similar_Dic.xlsx",
-             QN_Sino_path: str = "QuocNgu_SinoNom_Dic.xlsx"):
+def sorted_pages(folder_name: str):
+    """
+    Pages of a file of save_dir, in page order
+    """
+    return sorted(os.listdir(folder_name), key = lambda x: int(x.split()[1]))
+
+def page_images(folder_name: str, page: str):
+    """
+    Yield the label and char bbox files of the images of a page, up to the first image missing one of them
+    """
+    #
+    images = sorted(os.listdir(os.path.join(folder_name, page)), key = lambda x: int(x.split()[1]))
+    
+    #
+    for image in images:
+        #
+        label_file = ''.join(image.split()).lower() + "_label.txt"
+        char_label_file = ''.join(image.split()).lower() + "_char_bbox.txt"
+        
+        #
+        file_path = os.path.join(folder_name, page, image, label_file)
+        char_file_path = os.path.join(folder_name, page, image, char_label_file)
+        
+        #
+        if (not os.path.exists(file_path) or not os.path.exists(char_file_path)):
+            return
+        
+        yield file_path, char_file_path
+
+def read_boxes(file_path: str):
+    """
+    Read the sentence boxes of a label file, from its binary sidecar when the file is unchanged
+    """
+    return read_label_boxes(file_path)
+
+def read_char_boxes(char_file_path: str):
+    """
+    Read the character boxes of a char bbox file, sorted into columns
+    The boxes keep a quarter of the detected size, the size align_image exports them with
+    """
+    #
+    with open(char_file_path, "r", encoding = "utf-8") as file:
+        info = np.array([[float(x) for x in line.split()] for line in file], dtype = float).reshape(-1, 4)
+    
+    #
+    center_x, center_y, width, height = info.T
+    left, bottom = center_x - width / 4, center_y + height / 4
+    points = np.stack([np.stack([left, center_y], axis = 1),
+                       np.stack([center_x, center_y], axis = 1),
+                       np.stack([center_x, bottom], axis = 1),
+                       np.stack([left, bottom], axis = 1)], axis = 1)
+    
+    #     
+    return sort_boxes_in_correct_order(BoxSet(points), concat = False)
+
+def export_points(char_boxes: BoxSet):
+    """
+    Points of the character boxes at their detected size, as written in the records
+    """
+    points = char_boxes.points.copy()
+    
+    #
+    width = (points[:, 1, 0] - points[:, 0, 0]) * 4
+    height = (points[:, 2, 1] - points[:, 0, 1]) * 4
+    points[:, 1:3, 0] += (width / 2)[:, None]
+    points[:, 0:2, 1] -= (height / 2)[:, None]
+    points[:, [0, 3], 0] -= (width / 4)[:, None]
+    points[:, 2:4, 1] += (height / 4)[:, None]
+    
+    #! Kept numeric, CharRecord rounds and formats them on export
+    return points
+
+def sentence_pair(HN_sentence: str, QN_sentence: str):
+    """
+    Clean a SinoNom sentence and split its QN sentence into words, as taken by char_alignment
+    """
+    QN_list = []
     
     #
+    HN_sentence = re.sub('-', '', HN_sentence)
+    
+    #
+    if QN_sentence != "":
+        QN_list = re.sub(r"-", " ", QN_sentence.strip('.,?!:()[];').lower()).strip().split()
+        QN_list = [QN_word.strip(' .,?!:()[];') for QN_word in QN_list]
+    
+    return HN_sentence, QN_list
+
+def align_image(filename: str, page: str, file_path: str, char_file_path: str, HN: list, QN: list, HN_index: int,
+                SinoNom_Similar_Dict, QN_SinoNom_Dict, cache = None, dictionary = None, max_cells = None):
+    """
+    Align the sentences of one image, starting at sentence HN_index of the file
+    Returns the char records of the image and its number of sentence boxes
+    Sentences of more than max_cells alignment cells are aligned with the Hirschberg engine
+    """
     char_data = []
     
+    #
+    boxes = read_boxes(file_path)
+    char_boxes = read_char_boxes(char_file_path)
+    
+    #
+    sentence_pairs = [sentence_pair(HN[i], QN[i]) for i in range(HN_index, HN_index + len(boxes))]
+    
+    #
+    aligned_chars = []
+    marked_list = []
+    for aligned_char, marked in char_alignment_batch(sentence_pairs, SinoNom_Similar_Dict, QN_SinoNom_Dict,
+                                                 cache = cache, dictionary = dictionary, max_cells = max_cells):
+        marked_list.append(marked)
+        aligned_chars.append(aligned_char)
+    
+    #! Shared by the records of the image
+    page_number = f'{int(page[5:]):03}' if int(page[5:]) < 100 else page[5:]
+    image_name = f'{filename[:(len(filename) - 4)]}_page{page_number}.png'
+    prefix = f'{filename[:(len(filename) - 4)]}.{page_number}'
+    
+    #
+    for box_index in range(len(boxes)):
+        #
+        temp_index = 0
+        marked = marked_list[box_index]
+        char_points = export_points(char_boxes[box_index]) if box_index < len(char_boxes) else None
+        num_points = len(char_points) if char_points is not None else 0
+        for _, (sino, qn) in enumerate(aligned_chars[box_index]):
+            if (sino == ""):
+                char_data.append(CharRecord.inserted(qn))
+            else:
+                if (temp_index < num_points):
+                    #
+                    if qn == "":
+                        # Green color
+                        char_record = CharRecord(image_name, prefix, box_index, temp_index, char_points, sino, 'r')
+                    else:
+                        # No color, with the QN word
+                        char_record = CharRecord(image_name, prefix, box_index, temp_index, char_points,
+                                                 sino, marked[temp_index], qn)
+                
+                    #        
+                    char_data.append(char_record)
+                    temp_index += 1
+    
+    return char_data, len(boxes)
+
+def align_page(filename: str, folder_name: str, page: str, HN: list, QN: list, HN_index: int,
+               SinoNom_Similar_Dict, QN_SinoNom_Dict, cache = None, dictionary = None, max_cells = None):
+    """
+    Align the images of one page, starting at sentence HN_index of the file
+    Returns the char records of the page and the index of the first sentence of the next page
+    """
+    char_data = []
+    
+    #
+    for file_path, char_file_path in page_images(folder_name, page):
+        #
+        image_data, num_boxes = align_image(filename, page, file_path, char_file_path, HN, QN, HN_index,
+                                            SinoNom_Similar_Dict, QN_SinoNom_Dict,
+                                            cache = cache, dictionary = dictionary, max_cells = max_cells)
+        char_data += image_data
+        HN_index = HN_index + num_boxes
+    
+    #! The new cache rows are written once per page rather than once per sentence
+    if (cache is not None):
+        cache.commit()
+    
+    return char_data, HN_index
+
+def page_offsets(folder_name: str, pages: list):
+    """
+    Index of the first sentence of each page in its file, then the number of sentences of the file
+    Counted from the sentence boxes of the label files, so the pages can be aligned independently
+    """
+    offsets = [0]
+    for page in pages:
+        offsets.append(offsets[-1] + sum(len(read_boxes(file_path)) for file_path, _ in page_images(folder_name, page)))
+    
+    return offsets
+
+def page_start(folder_name: str, page: str):
+    """
+    Index of the first sentence of a page in its file: the number of sentence boxes of the pages before it
+    """
+    pages = sorted_pages(folder_name)
+    if (page in pages):
+        pages = pages[:pages.index(page)]
+    
+    return page_offsets(folder_name, pages)[-1]
+
+#! State of a worker process of get_data, inherited from the parent when processes are forked
+worker_state = {}
+
+def init_worker(Sino_sim_path: str, QN_Sino_path: str, cache_path: str, max_cells: int = None):
+    """
+    Set up the dictionaries of a worker process and open the cache read-only
+    Forked workers inherit the compiled dictionaries of the parent, the pages they read get copied as
+    their reference counts are written. Workers started with spawn or forkserver (the default on Linux
+    from Python 3.14) open the memory-mapped dictionaries and their compiled index instead of loading and
+    compiling their own: the file opens at once, its pages and the partial-match bitsets are shared by
+    every worker, and words are compared with the same ID lookups as in a forked worker
+    """
+    if ("dictionaries" not in worker_state):
+        worker_state["dictionaries"] = tuple(get_mapped_dictionaries(Sino_sim_path = Sino_sim_path,
+                                                                     QN_Sino_path = QN_Sino_path,
+                                                                     compiled = True))
+    worker_state["max_cells"] = max_cells
+    worker_state["cache"] = AlignmentCache(path = cache_path, dictionary_paths = [Sino_sim_path, QN_Sino_path],
+                                           read_only = True)
+
+def align_page_job(filename: str, folder_name: str, page: str, HN: list, QN: list):
+    """
+    Align a page in a worker process, HN and QN hold the sentences of the page only
+    Returns the char records, the new cache rows and the cache counters of the page
+    """
+    SinoNom_Similar_Dict, QN_SinoNom_Dict, dictionary = worker_state["dictionaries"]
+    cache = worker_state["cache"]
+    counters = (cache.hits, cache.disk_hits, cache.misses)
+    
+    #
+    char_data, _ = align_page(filename, folder_name, page, HN, QN, 0, SinoNom_Similar_Dict, QN_SinoNom_Dict,
+                              cache = cache, dictionary = dictionary, max_cells = worker_state["max_cells"])
+    
+    #
+    counters = (cache.hits - counters[0], cache.disk_hits - counters[1], cache.misses - counters[2])
+    return char_data, cache.take_new_entries(), counters
+
+def submit_page(executor, manifest, job: tuple):
+    """
+    Submit the job of a page, unless the manifest holds the records of its inputs
+    Returns the manifest key and fingerprint of a page to store once aligned, None for both otherwise, and its future
+    """
+    if (manifest is None):
+        return None, None, executor.submit(align_page_job, *job)
+    
+    #
+    filename, folder_name, page, HN, QN = job
+    key = manifest.key(folder_name, page)
+    fingerprint = manifest.fingerprint(list(page_images(folder_name, page)), HN, QN)
+    page_data = manifest.get(key, fingerprint)
+    if (page_data is None):
+        return key, fingerprint, executor.submit(align_page_job, *job)
+    
+    #! A reused page goes through the same queue, so that the pages keep their order
+    future = Future()
+    future.set_result((page_data, [], (0, 0, 0)))
+    return None, None, future
+
+def iter_data(input_dir: str,
+              save_dir: str,
+              Sino_sim_path: str = "SinoNom_similar_Dic.xlsx",
+              QN_Sino_path: str = "QuocNgu_SinoNom_Dic.xlsx",
+              cache_path: str = None,
+              workers: int = 1,
+              manifest_path: str = None,
+              max_cells: int = None):
+    """
+    Yield the records of each page as soon as it is aligned, in the order of get_data
+    Only the page being consumed is kept, plus the few pages the workers are ahead by
+    With a manifest, the pages whose inputs did not change since they were last aligned reuse their records
+    Sentences of more than max_cells alignment cells (MAX_TRACEBACK_CELLS by default) use the Hirschberg engine
+    """
     #
     dirs, temp_HN, temp_QN = collect_inputs_from_midterm(input_dir = input_dir,
                                                          save_dir = save_dir)
     
     #
-    SinoNom_Similar_Dict, QN_SinoNom_Dict = get_dictionaries(Sino_sim_path = Sino_sim_path,
-                                                             QN_Sino_path = QN_Sino_path)
+    SinoNom_Similar_Dict, QN_SinoNom_Dict, dictionary = get_dictionaries(Sino_sim_path = Sino_sim_path,
+                                                                         QN_Sino_path = QN_Sino_path,
+                                                                         compiled = True)
     
     #
+    cache = AlignmentCache(path = cache_path, dictionary_paths = [Sino_sim_path, QN_Sino_path])
+    manifest = None
+    if (manifest_path is not None):
+        manifest = RunManifest(path = manifest_path, dictionary_paths = [Sino_sim_path, QN_Sino_path])
+    
+    #! Files of save_dir up to the first missing one, with their pages
+    files = []
     for index, filename in enumerate(dirs):
         #
         folder_name = os.path.join(save_dir, filename)
@@ -40,148 +311,130 @@ def get_data(input_dir: str,
             break
         
         #
-        HN = temp_HN[index]
-        QN = temp_QN[index]
-        HN_index = 0
-        
-        #
-        pages = sorted(os.listdir(folder_name), key = lambda x: int(x.split()[1]))
-        
-        #
-        for page_index in tqdm(range(len(pages)), desc = f"Processing file {index + 1}"):
-            #
-            page = pages[page_index]
-            images = sorted(os.listdir(os.path.join(folder_name, page)), key = lambda x: int(x.split()[1]))
-            
-            #
-            for image in images:
-                #
-                label_file = ''.join(image.split()).lower() + "_label.txt"
-                char_label_file = ''.join(image.split()).lower() + "_char_bbox.txt"
-                
-                #
-                file_path = os.path.join(folder_name, page, image, label_file)
-                char_file_path = os.path.join(folder_name, page, image, char_label_file)
-                
-                #
-                if (not os.path.exists(file_path) or not os.path.exists(char_file_path)):
-                    break
-                
-                boxes = []         #
-                char_boxes = []    #
-
-                #
-                with open(file_path, "r", encoding = "utf-8") as file:
-                    for line in file:
-                        json_data = line.replace("'", '"')
-                        json_data = re.sub(
-                            r'\\U([0-9A-Fa-f]{8})', 
-                            lambda match: chr(int(match.group(1), 16)), 
-                            json_data
-                        )
-                        boxes += json.loads(json_data)
-                
+        files.append((index, filename, folder_name, sorted_pages(folder_name)))
+    
+    #! The cache is closed even when the consumer stops early
+    try:
+        if (workers <= 1):
+            for index, filename, folder_name, pages in files:
                 #
-                with open(char_file_path, "r", encoding = "utf-8") as file:
-                    lines = file.readlines()
-                    for line in lines:
-                        info = [float(x) for x in line.split()]
-                        center_x, center_y, width, height = info
-                        box = {
-                            "points": [
-                                [center_x - width / 4, center_y],
-                                [center_x, center_y],
-                                [center_x, center_y + height / 4],
-                                [center_x - width / 4, center_y + height / 4]
-                            ]
-                        }
-                        char_boxes.append(box)
-                
-                #     
-                char_boxes = sort_boxes_in_correct_order(char_boxes, concat = False)
+                HN = temp_HN[index]
+                QN = temp_QN[index]
+                HN_index = 0
                 
                 #
-                aligned_chars = []
-                marked_list = []
-                for i in range(HN_index, HN_index + len(boxes)):
-                    #
-                    HN_sentence = HN[i]
-                    QN_sentence = QN[i]
-                    QN_list = []
+                for page_index in tqdm(range(len(pages)), desc = f"Processing file {index + 1}"):
+                    page = pages[page_index]
                     
-                    #
-                    HN_sentence = re.sub('-', '', HN_sentence)
+                    #! Records of an unchanged page are taken from the manifest
+                    if (manifest is not None):
+                        end = HN_index + page_offsets(folder_name, [page])[-1]
+                        key = manifest.key(folder_name, page)
+                        fingerprint = manifest.fingerprint(list(page_images(folder_name, page)),
+                                                           HN[HN_index:end], QN[HN_index:end])
+                        page_data = manifest.get(key, fingerprint)
+                        if (page_data is not None):
+                            HN_index = end
+                            yield page_data
+                            continue
                     
                     #
-                    if QN_sentence != "":
-                        QN_list = re.sub(r"-", " ", QN_sentence.strip('.,?!:()[];').lower()).strip().split()
-                        QN_list = [QN_word.strip(' .,?!:()[];') for QN_word in QN_list]
+                    page_data, HN_index = align_page(filename, folder_name, page, HN, QN, HN_index,
+                                                     SinoNom_Similar_Dict, QN_SinoNom_Dict,
+                                                     cache = cache, dictionary = dictionary, max_cells = max_cells)
+                    if (manifest is not None):
+                        manifest.put(key, fingerprint, page_data)
+                    yield page_data
+        else:
+            #! Each page gets the sentences from its offset, the records are yielded back in page order
+            jobs = []
+            for index, filename, folder_name, pages in files:
+                offsets = page_offsets(folder_name, pages)
+                for page_index, page in enumerate(pages):
+                    start, end = offsets[page_index], offsets[page_index + 1]
+                    jobs.append((filename, folder_name, page, temp_HN[index][start:end], temp_QN[index][start:end]))
+            
+            if (multiprocessing.get_start_method() == "fork"):
+                #! Forked workers inherit the loaded dictionaries
+                worker_state["dictionaries"] = (SinoNom_Similar_Dict, QN_SinoNom_Dict, dictionary)
+            else:
+                #! The other workers map the dictionaries and their compiled index, written once before they start
+                get_mapped_dictionaries(Sino_sim_path = Sino_sim_path, QN_Sino_path = QN_Sino_path,
+                                        loaded = (SinoNom_Similar_Dict, QN_SinoNom_Dict, dictionary))
+            with ProcessPoolExecutor(max_workers = workers,
+                                     initializer = init_worker,
+                                     initargs = (Sino_sim_path, QN_Sino_path, cache_path, max_cells)) as executor:
+                #! Only a window of pages is submitted ahead, so finished pages do not pile up behind a slow consumer
+                remaining = iter(jobs)
+                pending = deque(submit_page(executor, manifest, job) for job in islice(remaining, 2 * workers))
+                with tqdm(total = len(jobs), desc = "Processing pages") as progress:
+                    while pending:
+                        key, fingerprint, future = pending.popleft()
+                        page_data, entries, counters = future.result()
+                        for job in islice(remaining, 1):
+                            pending.append(submit_page(executor, manifest, job))
                         
-                    #
-                    aligned_char, marked = char_alignment(HN_sentence, QN_list, SinoNom_Similar_Dict, QN_SinoNom_Dict)
-                    marked_list.append(marked)
-                    aligned_chars.append(aligned_char)
-                    
-                #
-                HN_index = HN_index + len(boxes)
-                    
-                #
-                for box_index in range(len(boxes)):
-                    #
-                    page_number = f'{int(page[5:]):03}' if int(page[5:]) < 100 else page[5:]
-                    box_str = f'{box_index:03}' if box_index < 100 else str(box_index)
-                    
-                    #
-                    temp_index = 0
-                    marked = marked_list[box_index]
-                    for _, (sino, qn) in enumerate(aligned_chars[box_index]):
-                        if (sino == ""):
-                            char_record = ["", "", ["", 'n'], ["", []], qn]
-                            char_data.append(char_record)
-                        else:
-                            if (temp_index < len(char_boxes[box_index])):
-                                #
-                                char_record = [f'{filename[:(len(filename) - 4)]}_page{page_number}.png',
-                                            f'{filename[:(len(filename) - 4)]}.{page_number}.{box_str}.{temp_index}']
-                                
-                                #
-                                points = [point for point in char_boxes[box_index][temp_index]['points']]
-                                
-                                #
-                                width, height = (points[1][0] - points[0][0]) * 4, (points[2][1] - points[0][1]) * 4
-                                points[1][0] = round(points[1][0] + width / 2, 4)
-                                points[2][0] = round(points[2][0] + width / 2, 4)
-                                points[0][1] = round(points[0][1] - height / 2, 4)
-                                points[1][1] = round(points[1][1] - height / 2, 4)
-                                points[0][0] = round(points[0][0] - width / 4, 4)
-                                points[3][0] = round(points[3][0] - width / 4, 4)
-                                points[2][1] = round(points[2][1] + height / 4, 4)
-                                points[3][1] = round(points[3][1] + height / 4, 4)
-                                
-                                #
-                                points = [tuple(point) for point in points]
-                                
-                                #
-                                if qn == "":
-                                    char_record.append([f'{points}', 'g'])     # Green color
-                                    char_record.append([sino, ['r']])
-                                else:
-                                    #
-                                    char_record.append([f'{points}', 'n'])     # No color
-                                    char_record.append([sino, [marked[temp_index]]])
-                                    char_record.append(qn)                     # QN word
-                            
-                                #        
-                                char_data.append(char_record)
-                                temp_index += 1
+                        #
+                        if (key is not None):
+                            manifest.put(key, fingerprint, page_data)
+                        cache.add_entries(entries)
+                        cache.commit()
+                        cache.hits, cache.disk_hits, cache.misses = (cache.hits + counters[0],
+                                                                     cache.disk_hits + counters[1],
+                                                                     cache.misses + counters[2])
+                        progress.update()
+                        yield page_data
+    finally:
+        #
+        worker_state.clear()
+        print(cache.report())
+        cache.close()
+        if (manifest is not None):
+            print(manifest.report())
+            manifest.close()
+
+def get_data(input_dir: str,
+             save_dir: str,
+             Sino_sim_path: str = "SinoNom_similar_Dic.xlsx",
+             QN_Sino_path: str = "QuocNgu_SinoNom_Dic.xlsx",
+             cache_path: str = None,
+             workers: int = 1,
+             manifest_path: str = None,
+             max_cells: int = None):
+    """
+    Records of every page as one list, see iter_data to handle them page by page
+    """
+    #
+    char_data = []
+    for page_data in iter_data(input_dir = input_dir,
+                               save_dir = save_dir,
+                               Sino_sim_path = Sino_sim_path,
+                               QN_Sino_path = QN_Sino_path,
+                               cache_path = cache_path,
+                               workers = workers,
+                               manifest_path = manifest_path,
+                               max_cells = max_cells):
+        char_data += page_data
                     
     return char_data
 
-#! Get data
-char_data = get_data(input_dir = "midterm_result",
-                     save_dir = 'OCR_result',
-                     Sino_sim_path = "dictionary/SinoNom_similar_Dic.xlsx",
-                     QN_Sino_path = "dictionary/QuocNgu_SinoNom_Dic.xlsx")
+def iter_records(pages):
+    """
+    Records of the pages yielded by iter_data, one at a time
+    """
+    for page_data in pages:
+        yield from page_data
+
+if __name__ == "__main__":
+    #! Get data, page by page
+    pages = iter_data(input_dir = "midterm_result",
+                      save_dir = 'OCR_result',
+                      Sino_sim_path = "dictionary/SinoNom_similar_Dic.xlsx",
+                      QN_Sino_path = "dictionary/QuocNgu_SinoNom_Dic.xlsx",
+                      cache_path = "Output/alignment_cache.sqlite",
+                      workers = os.cpu_count(),
+                      manifest_path = "Output/run_manifest.sqlite")
 
-#! Export the processed and aligned data to an Excel file with color-coded formatting
-export_excel_file(file_name = "Output/Prj_19_CK.xlsx", data = char_data)   
\ No newline at end of file
+    #! Export the processed and aligned data to an Excel file with color-coded formatting,
+    #! each row is written as soon as its page is aligned
+    export_excel_file(file_name = "Output/Prj_19_CK.xlsx", data = iter_records(pages), constant_memory = True)   
@@ -0,0 +1,90 @@
+import os
+import json
+import pickle
+import sqlite3
+import hashlib
+
+from cache import files_fingerprint
+
+#! Bumped when the records of a page change for the same inputs, so that older manifests are emptied
+MANIFEST_VERSION = "2"
+
+def page_fingerprint (image_files: list, HN: list, QN: list, dictionary_version: str):
+    """
+    Hash everything the records of a page are computed from: the content of its label and
+    char bbox files, its HN and QN sentences and the version of the dictionaries
+    """
+    digest = hashlib.sha256()
+    for paths in image_files:
+        for path in paths:
+            with open (path, 'rb') as file:
+                content = file.read()
+            digest.update(len(content).to_bytes(8, 'little'))
+            digest.update(content)
+
+    digest.update(json.dumps([HN, QN, dictionary_version], ensure_ascii = False).encode('utf-8'))
+    return digest.hexdigest()
+
+class RunManifest:
+    """
+    Records of every aligned page with the fingerprint of its inputs, kept in an SQLite file
+    A page whose fingerprint did not change reuses its records instead of being aligned again,
+    and since each page is committed once aligned, an interrupted run resumes after the last one
+    """
+    def __init__ (self, path: str, dictionary_paths: list = ()):
+        self.reused = 0
+        self.aligned = 0
+
+        if (os.path.dirname(path) and not os.path.exists(os.path.dirname(path))):
+            os.makedirs(os.path.dirname(path))
+
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS pages (key TEXT PRIMARY KEY, fingerprint TEXT, records BLOB)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+
+        #! Records written by another version of the alignment are dropped
+        stored = self.connection.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+        if (stored is None or stored[0] != MANIFEST_VERSION):
+            self.connection.execute("DELETE FROM pages")
+            self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (MANIFEST_VERSION,))
+        self.connection.commit()
+
+        #! The pages fingerprint the dictionaries with their content, as the alignment cache does
+        self.dictionary_version = files_fingerprint(dictionary_paths)
+
+    @staticmethod
+    def key (folder_name: str, page: str):
+        return os.path.join(folder_name, page)
+
+    def fingerprint (self, image_files: list, HN: list, QN: list):
+        return page_fingerprint(image_files, HN, QN, self.dictionary_version)
+
+    def get (self, key: str, fingerprint: str):
+        """
+        Return the records stored for a page when its fingerprint matches, or None
+        """
+        row = self.connection.execute("SELECT fingerprint, records FROM pages WHERE key = ?", (key,)).fetchone()
+        if (row is None or row[0] != fingerprint):
+            return None
+
+        self.reused += 1
+        return pickle.loads(row[1])
+
+    def put (self, key: str, fingerprint: str, records: list):
+        """
+        Store the records of a page and commit them, so that they survive an interruption
+        The CharRecord objects are pickled, keeping the strings and points arrays they share
+        """
+        self.aligned += 1
+        self.connection.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?)",
+                                (key, fingerprint, pickle.dumps(records, protocol = pickle.HIGHEST_PROTOCOL)))
+        self.connection.commit()
+
+    def close (self):
+        if (self.connection is not None):
+            self.connection.commit()
+            self.connection.close()
+            self.connection = None
+
+    def report (self):
+        return f"Run manifest: {self.reused} pages reused, {self.aligned} pages aligned"
@@ -0,0 +1,64 @@
+class CharRecord:
+    """
+    One aligned character, kept compact until it is exported
+    The image name and the id prefix are shared by the records of an image, and the points
+    array by the records of a sentence box, which only hold their position in it
+    A record without points is an inserted QN word, a record without QN word is a deleted char
+    """
+    __slots__ = ("image_name", "prefix", "box", "position", "char_points", "sino", "marked", "qn")
+
+    def __init__ (self, image_name: str = "", prefix: str = "", box: int = 0, position: int = 0,
+                  char_points = None, sino: str = "", marked: str = "", qn: str = None):
+        self.image_name = image_name
+        self.prefix = prefix
+        self.box = box
+        self.position = position
+        self.char_points = char_points
+        self.sino = sino
+        self.marked = marked
+        self.qn = qn
+
+    @classmethod
+    def inserted (cls, qn: str):
+        return cls(qn = qn)
+
+    @property
+    def is_inserted (self):
+        return self.char_points is None
+
+    @property
+    def is_deleted (self):
+        return self.char_points is not None and self.qn is None
+
+    @property
+    def points (self):
+        """
+        The (4, 2) points of the character box at its detected size, None for an inserted word
+        """
+        if (self.char_points is None):
+            return None
+        return self.char_points[self.position]
+
+    @property
+    def char_id (self):
+        if (self.char_points is None):
+            return ""
+        return f'{self.prefix}.{self.box:03}.{self.position}'
+
+    def image_box (self):
+        """
+        The points as written in the Image Box column, rounded to 4 decimals
+        """
+        if (self.char_points is None):
+            return ""
+        return f'{[tuple(round(value, 4) for value in point) for point in self.points.tolist()]}'
+
+    def to_list (self):
+        """
+        The record as the nested list of the Excel and JSON files, only needed when exporting
+        """
+        if (self.char_points is None):
+            return ["", "", ["", 'n'], ["", []], self.qn]
+        if (self.qn is None):
+            return [self.image_name, self.char_id, [self.image_box(), 'g'], [self.sino, ['r']]]     # Green color
+        return [self.image_name, self.char_id, [self.image_box(), 'n'], [self.sino, [self.marked]], self.qn]
@@ -0,0 +1,233 @@
+#
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import contextlib
+
+#
+from extract_input import collect_inputs_from_midterm
+from dictionary import get_dictionaries
+from cache import AlignmentCache
+
+#
+from alignment import char_alignment
+from main import sorted_pages, sentence_pair, align_page, page_start
+
+class AlignmentServer:
+    """
+    Keeps the dictionaries, the alignment cache and the midterm inputs loaded between alignment jobs
+    Jobs and responses are JSON objects, one per line:
+        {"id": 1, "type": "pair", "sino": "...", "qn": "..."}      (qn is a sentence or a list of words)
+        {"id": 2, "type": "page", "file": "<file>", "page": "Page 3"}
+        {"id": 3, "type": "tree"}                                   (one response per page, then "done")
+        {"id": 4, "type": "reload"}                                 (collect the midterm inputs again)
+        {"type": "shutdown"}
+    """
+    def __init__ (self,
+                  input_dir: str = "midterm_result",
+                  save_dir: str = "OCR_result",
+                  Sino_sim_path: str = "SinoNom_similar_Dic.xlsx",
+                  QN_Sino_path: str = "QuocNgu_SinoNom_Dic.xlsx",
+                  cache_path: str = None,
+                  max_cells: int = None):
+        self.input_dir = input_dir
+        self.save_dir = save_dir
+        self.max_cells = max_cells
+
+        #! Loaded once, used by every job
+        self.SinoNom_Similar_Dict, self.QN_SinoNom_Dict, self.dictionary = get_dictionaries(
+            Sino_sim_path = Sino_sim_path,
+            QN_Sino_path = QN_Sino_path,
+            compiled = True
+        )
+        self.cache = AlignmentCache(path = cache_path, dictionary_paths = [Sino_sim_path, QN_Sino_path])
+
+        #! HN and QN sentences of each file, collected on the first page or tree job
+        self.files = None
+        self.sentences = None
+
+    def load_inputs (self, reload: bool = False):
+        if (self.files is None or reload):
+            #! Keep stdout for the responses
+            with contextlib.redirect_stdout(sys.stderr):
+                try:
+                    dirs, temp_HN, temp_QN = collect_inputs_from_midterm(input_dir = self.input_dir,
+                                                                         save_dir = self.save_dir)
+                except SystemExit:
+                    raise ValueError(f"Cannot collect the inputs of {self.input_dir}")
+
+            self.files = dirs
+            self.sentences = {filename: (temp_HN[index], temp_QN[index]) for index, filename in enumerate(dirs)}
+
+    def align_pair (self, sino: str, qn):
+        #
+        if (isinstance(qn, str)):
+            sino, qn = sentence_pair(sino, qn)
+
+        alignment, marked = char_alignment(sino, qn, self.SinoNom_Similar_Dict, self.QN_SinoNom_Dict,
+                                           cache = self.cache, dictionary = self.dictionary, max_cells = self.max_cells)
+        self.cache.commit()
+
+        return {"alignment": alignment, "marked": marked}
+
+    def align_images (self, filename: str, page: str, HN_index: int):
+        #! Same records as get_data gives for the page
+        HN, QN = self.sentences[filename]
+        folder_name = os.path.join(self.save_dir, filename)
+
+        return align_page(filename, folder_name, page, HN, QN, HN_index,
+                          self.SinoNom_Similar_Dict, self.QN_SinoNom_Dict,
+                          cache = self.cache, dictionary = self.dictionary, max_cells = self.max_cells)
+
+    def align_page (self, filename: str, page: str):
+        self.load_inputs()
+        if (filename not in self.sentences):
+            raise ValueError(f"Unknown file: {filename}")
+
+        records, _ = self.align_images(filename, page, page_start(os.path.join(self.save_dir, filename), page))
+
+        return records
+
+    def align_tree (self):
+        """
+        Yield the (file, page, records) of every page, in the order of get_data
+        """
+        self.load_inputs()
+
+        for filename in self.files:
+            #
+            folder_name = os.path.join(self.save_dir, filename)
+            if (not os.path.isdir(folder_name)):
+                break
+
+            #
+            HN_index = 0
+            for page in sorted_pages(folder_name):
+                records, HN_index = self.align_images(filename, page, HN_index)
+                yield filename, page, records
+
+    def handle (self, job: dict):
+        """
+        Run one job and yield its responses as soon as they are ready
+        """
+        job_id = job.get("id")
+        start = time.perf_counter()
+
+        def response (**content):
+            return {"id": job_id, "ok": True, **content, "seconds": round(time.perf_counter() - start, 4)}
+
+        try:
+            kind = job.get("type")
+            if (kind == "pair"):
+                yield response(result = self.align_pair(job["sino"], job["qn"]))
+
+            elif (kind == "page"):
+                records = self.align_page(job["file"], job["page"])
+                yield response(file = job["file"], page = job["page"],
+                               records = [record.to_list() for record in records])
+
+            elif (kind == "tree"):
+                for filename, page, records in self.align_tree():
+                    yield response(file = filename, page = page, records = [record.to_list() for record in records],
+                                   done = False)
+                yield response(done = True)
+
+            elif (kind == "reload"):
+                self.load_inputs(reload = True)
+                yield response(files = self.files)
+
+            elif (kind == "ping"):
+                yield response()
+
+            else:
+                raise ValueError(f"Unknown job type: {kind}")
+
+        except Exception as error:
+            yield {"id": job_id, "ok": False, "error": f"{type(error).__name__}: {error}"}
+
+    def serve_lines (self, reader, writer):
+        """
+        Answer the jobs read line by line, returns False once a shutdown job was received
+        """
+        for line in reader:
+            line = line.strip()
+            if (not line):
+                continue
+
+            try:
+                job = json.loads(line)
+            except json.JSONDecodeError as error:
+                responses = [{"id": None, "ok": False, "error": f"Invalid JSON: {error}"}]
+            else:
+                if (job.get("type") == "shutdown"):
+                    writer.write(json.dumps({"id": job.get("id"), "ok": True}) + "\n")
+                    writer.flush()
+                    return False
+                responses = self.handle(job)
+
+            for content in responses:
+                writer.write(json.dumps(content, ensure_ascii = False) + "\n")
+                writer.flush()
+
+        return True
+
+    def serve_socket (self, socket_path: str):
+        """
+        Answer the connections of a Unix socket one after the other
+        """
+        if (os.path.exists(socket_path)):
+            os.remove(socket_path)
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(socket_path)
+        server.listen()
+
+        try:
+            running = True
+            while (running):
+                connection, _ = server.accept()
+                with connection, \
+                     connection.makefile('r', encoding = 'utf-8') as reader, \
+                     connection.makefile('w', encoding = 'utf-8') as writer:
+                    try:
+                        running = self.serve_lines(reader, writer)
+                    except (BrokenPipeError, ConnectionResetError):
+                        pass
+        finally:
+            server.close()
+            os.remove(socket_path)
+
+    def close (self):
+        self.cache.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Alignment server keeping the dictionaries loaded, "
+                                                   "jobs are read as JSON lines from stdin or a Unix socket")
+    parser.add_argument("--input-dir", default = "midterm_result")
+    parser.add_argument("--save-dir", default = "OCR_result")
+    parser.add_argument("--sino-sim", default = "dictionary/SinoNom_similar_Dic.xlsx")
+    parser.add_argument("--qn-sino", default = "dictionary/QuocNgu_SinoNom_Dic.xlsx")
+    parser.add_argument("--cache", default = "Output/alignment_cache.sqlite")
+    parser.add_argument("--max-cells", type = int, default = None,
+                        help = "Sentences of more alignment cells are aligned in low memory (Hirschberg)")
+    parser.add_argument("--socket", default = None, help = "Path of the Unix socket, stdin and stdout otherwise")
+    args = parser.parse_args()
+
+    server = AlignmentServer(input_dir = args.input_dir,
+                             save_dir = args.save_dir,
+                             Sino_sim_path = args.sino_sim,
+                             QN_Sino_path = args.qn_sino,
+                             cache_path = args.cache,
+                             max_cells = args.max_cells)
+    print("Alignment server ready", file = sys.stderr)
+
+    try:
+        if (args.socket is not None):
+            server.serve_socket(args.socket)
+        else:
+            server.serve_lines(sys.stdin, sys.stdout)
+    finally:
+        server.close()
@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+from dictionary import CompiledDictionary
+from alignment import char_alignment, alignment_score, alignment_quality, best_pairing
+
+SINO = ["好", "妤", "衰", "哀", "人", "入", "天", "夫"]
+QN_WORDS = ["tốt", "suy", "người", "trời", "phu", "x"]
+
+def random_dictionaries(rnd):
+    SinoNom_Similar_Dict = {letter: [letter] + rnd.sample(SINO, 2) for letter in SINO}
+    QN_SinoNom_Dict = {word: rnd.sample(SINO, rnd.randint(1, 2)) for word in QN_WORDS[:-1]}
+    return SinoNom_Similar_Dict, QN_SinoNom_Dict
+
+def random_pair(rnd):
+    ocr_sino = "".join(rnd.choice(SINO) for _ in range(rnd.randint(1, 12)))
+    QN = [rnd.choice(QN_WORDS) for _ in range(rnd.randint(1, 12))]
+    return ocr_sino, QN
+
+def alignment_cost(alignment: list, marked: list):
+    """
+    Cost of a char_alignment result: 1 per inserted QN word or unpaired character, 2 per mismatch
+    """
+    cost = 0
+    marks = iter(marked)
+    for sino, qn in alignment:
+        if (sino == ""):
+            cost += 1
+        elif (next(marks) == 'r'):
+            cost += 1 if qn == "" else 2
+    return cost
+
+@pytest.mark.parametrize("compiled", [False, True])
+def test_score_is_the_cost_of_char_alignment(compiled):
+    rnd = random.Random(0)
+    for _ in range(30):
+        SinoNom_Similar_Dict, QN_SinoNom_Dict = random_dictionaries(rnd)
+        dictionary = CompiledDictionary(SinoNom_Similar_Dict, QN_SinoNom_Dict) if compiled else None
+        for _ in range(20):
+            ocr_sino, QN = random_pair(rnd)
+            cost = alignment_cost(*char_alignment(ocr_sino, QN, SinoNom_Similar_Dict, QN_SinoNom_Dict))
+            assert alignment_score(ocr_sino, QN, SinoNom_Similar_Dict, QN_SinoNom_Dict, dictionary = dictionary) == cost
+            assert alignment_score(ocr_sino, QN, SinoNom_Similar_Dict, QN_SinoNom_Dict, upper_bound = cost,
+                                   dictionary = dictionary) == cost
+            if (cost > 0):
+                assert alignment_score(ocr_sino, QN, SinoNom_Similar_Dict, QN_SinoNom_Dict, upper_bound = cost - 1,
+                                       dictionary = dictionary) == cost
+            assert alignment_quality(ocr_sino, QN, SinoNom_Similar_Dict, QN_SinoNom_Dict,
+                                     dictionary = dictionary) == 1 - cost / (len(ocr_sino) + len(QN))
+
+def test_best_pairing_picks_the_cheapest_candidate():
+    rnd = random.Random(1)
+    for _ in range(100):
+        SinoNom_Similar_Dict, QN_SinoNom_Dict = random_dictionaries(rnd)
+        ocr_sino = random_pair(rnd)[0]
+        candidates = [random_pair(rnd)[1] for _ in range(rnd.randint(1, 6))]
+        costs = [alignment_cost(*char_alignment(ocr_sino, QN, SinoNom_Similar_Dict, QN_SinoNom_Dict))
+                 for QN in candidates]
+
+        #! The first candidate of least cost
+        assert best_pairing(ocr_sino, candidates, SinoNom_Similar_Dict, QN_SinoNom_Dict) == (costs.index(min(costs)),
+                                                                                             min(costs))
+
+def test_best_pairing_without_candidates():
+    assert best_pairing("好", [], {}, {}) == (None, None)
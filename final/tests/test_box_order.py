@@ -0,0 +1,108 @@
+import copy
+import random
+
+import pytest
+
+from boxes import BoxSet
+from alignment import box_columns, sort_boxes_in_correct_order
+
+def reference_columns(boxes: list):
+    """
+    Columns of the original pairwise sort_boxes_in_correct_order, as lists of box indices
+    """
+    points = [box["points"] for box in boxes]
+    remaining = list(range(len(boxes)))
+    columns = []
+
+    while remaining:
+        # The first box with no box to its right
+        for i in remaining:
+            if not any(j != i and max(points[j][0][0], points[j][3][0]) >= min(points[i][1][0], points[i][2][0])
+                       for j in remaining):
+                column = [i]
+                break
+
+        # Two passes over the boxes overlapping a box of the column in x
+        def overlaps(i):
+            return any(points[i][0][0] <= points[j][0][0] <= points[i][1][0]
+                       or points[i][0][0] <= points[j][1][0] <= points[i][1][0]
+                       or points[j][0][0] <= points[i][0][0] <= points[i][1][0] <= points[j][1][0] for j in column)
+
+        for _ in range(2):
+            for i in remaining:
+                if i not in column and overlaps(i):
+                    column.append(i)
+
+        # Rows peeled from the top, each one from right to left
+        rows = []
+        left = list(column)
+        while left:
+            top = [i for i in left
+                   if not any(j != i and max(points[i][0][1], points[i][1][1]) >= min(points[j][2][1], points[j][3][1])
+                              for j in left)]
+            rows.extend(sorted(top, key = lambda i: points[i][0][0], reverse = True))
+            left = [i for i in left if i not in top]
+
+        columns.append(rows)
+        remaining = [i for i in remaining if i not in rows]
+
+    return columns
+
+def quad(rnd, x1, y1, x2, y2, skew = 0.0, jitter = 0.0):
+    def shake():
+        return rnd.uniform(-jitter, jitter)
+    return [[x1 + shake(), y1 + skew + shake()], [x2 + shake(), y1 + shake()],
+            [x2 + skew + shake(), y2 + shake()], [x1 + skew + shake(), y2 + skew + shake()]]
+
+def random_page(rnd, kind: str):
+    boxes = []
+    if (kind == "chars"):
+        #! Small character boxes in columns, from right to left
+        for column in range(rnd.randint(1, 12)):
+            x = 0.95 - column * 0.05 + rnd.uniform(-0.01, 0.01)
+            for row in range(rnd.randint(1, 15)):
+                y = 0.03 + row * 0.035 + rnd.uniform(-0.01, 0.01)
+                width, height = rnd.uniform(0.005, 0.015), rnd.uniform(0.005, 0.015)
+                boxes.append({"points": [[x - width, y], [x, y], [x, y + height], [x - width, y + height]]})
+    elif (kind == "sentences"):
+        #! Tall sentence boxes, a few per column, slightly skewed
+        for column in range(rnd.randint(1, 10)):
+            x2 = 1000 - column * rnd.uniform(30, 80)
+            x1 = x2 - rnd.uniform(20, 60)
+            y = 0
+            for row in range(rnd.randint(1, 3)):
+                y1 = y + rnd.uniform(0, 30)
+                y = y1 + rnd.uniform(40, 400)
+                boxes.append({"points": quad(rnd, x1, y1, x2, y, rnd.uniform(-8, 8), 3)})
+    else:
+        #! Integer boxes scattered over a small page
+        for _ in range(rnd.randint(0, 25)):
+            x1, y1 = rnd.randint(0, 50), rnd.randint(0, 50)
+            boxes.append({"points": quad(rnd, x1, y1, x1 + rnd.randint(1, 15), y1 + rnd.randint(1, 15))})
+
+    for index, box in enumerate(boxes):
+        box["transcription"] = str(index)
+    rnd.shuffle(boxes)
+    return boxes
+
+@pytest.mark.parametrize("kind", ["chars", "sentences", "scattered"])
+def test_columns_match_pairwise_order(kind):
+    rnd = random.Random(kind)
+    for _ in range(150):
+        boxes = random_page(rnd, kind)
+        assert box_columns(BoxSet.from_dicts(boxes)) == reference_columns(boxes)
+
+def test_sort_of_dicts_and_box_sets_agree():
+    rnd = random.Random(0)
+    for _ in range(50):
+        boxes = random_page(rnd, "sentences")
+        expected = [[boxes[i]["transcription"] for i in column] for column in reference_columns(boxes)]
+
+        columns = sort_boxes_in_correct_order(copy.deepcopy(boxes), concat = False)
+        assert [[box["transcription"] for box in column] for column in columns] == expected
+
+        box_sets = sort_boxes_in_correct_order(BoxSet.from_dicts(boxes), concat = False)
+        assert [box_set.transcriptions for box_set in box_sets] == expected
+
+        #! Concatenated, each column becomes one box with the texts in reading order
+        assert sort_boxes_in_correct_order(BoxSet.from_dicts(boxes)).transcriptions == ["".join(column) for column in expected]
@@ -0,0 +1,86 @@
+import sqlite3
+
+from cache import AlignmentCache
+from alignment import char_alignment
+
+SINO_SIMILAR = {"好": ["好", "妤"], "衰": ["衰"]}
+QN_SINO = {"tốt": ["好"], "suy": ["衰", "妤"]}
+
+def write_dictionaries(tmp_path, content: bytes = b"v1"):
+    paths = [str(tmp_path / "similar.xlsx"), str(tmp_path / "quoc_ngu.xlsx")]
+    for path in paths:
+        with open (path, 'wb') as file:
+            file.write(content)
+    return paths
+
+def test_reuse_across_runs(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    dictionary_paths = write_dictionaries(tmp_path)
+    value = ([("好", "tốt"), ("衰", "")], ['n', 'r'])
+
+    cache = AlignmentCache(path = path, dictionary_paths = dictionary_paths)
+    assert cache.get("好衰", ["tốt", "x"]) is None
+    cache.put("好衰", ["tốt", "x"], value)
+    assert cache.get("好衰", ["tốt", "x"]) == value
+    cache.close()
+
+    cache = AlignmentCache(path = path, dictionary_paths = dictionary_paths)
+    assert cache.get("好衰", ["tốt", "x"]) == value
+    assert cache.get("好衰", ["tốt", "x"]) == value
+    assert (cache.hits, cache.disk_hits, cache.misses) == (1, 1, 0)
+    #! Another variant of the same pair is another entry
+    assert cache.get("好衰", ["tốt", "x"], variant = "anchored") is None
+    cache.close()
+
+def test_changed_dictionaries_empty_the_file(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = AlignmentCache(path = path, dictionary_paths = write_dictionaries(tmp_path))
+    cache.put("好", ["tốt"], ([("好", "tốt")], ['n']))
+    cache.close()
+
+    cache = AlignmentCache(path = path, dictionary_paths = write_dictionaries(tmp_path, b"v2"))
+    assert cache.get("好", ["tốt"]) is None
+    cache.close()
+
+def test_memory_tier_is_bounded():
+    cache = AlignmentCache(max_entries = 2)
+    for index in range(3):
+        cache.put(str(index), [], ([], []))
+    assert cache.get("0", []) is None
+    assert cache.get("1", []) == ([], [])
+    assert cache.get("2", []) == ([], [])
+
+def test_read_only_cache_hands_its_rows_over(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    dictionary_paths = write_dictionaries(tmp_path)
+    owner = AlignmentCache(path = path, dictionary_paths = dictionary_paths)
+
+    worker = AlignmentCache(path = path, dictionary_paths = dictionary_paths, read_only = True)
+    worker.put("好", ["tốt"], ([("好", "tốt")], ['n']))
+    owner.add_entries(worker.take_new_entries())
+    assert worker.take_new_entries() == []
+    owner.commit()
+    worker.close()
+
+    owner.close()
+
+    connection = sqlite3.connect(path)
+    assert connection.execute("SELECT COUNT(*) FROM alignments").fetchone() == (1,)
+    connection.close()
+
+def test_char_alignment_uses_the_cache(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    dictionary_paths = write_dictionaries(tmp_path)
+    expected = char_alignment("好衰", ["tốt", "suy"], SINO_SIMILAR, QN_SINO)
+
+    cache = AlignmentCache(path = path, dictionary_paths = dictionary_paths)
+    assert char_alignment("好衰", ["tốt", "suy"], SINO_SIMILAR, QN_SINO, cache = cache) == expected
+    assert char_alignment("好衰", ["tốt", "suy"], SINO_SIMILAR, QN_SINO, cache = cache) == expected
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
+
+    #! Results read back from the file are the same tuples as the aligned ones
+    cache = AlignmentCache(path = path, dictionary_paths = dictionary_paths)
+    assert char_alignment("好衰", ["tốt", "suy"], SINO_SIMILAR, QN_SINO, cache = cache) == expected
+    assert cache.disk_hits == 1
+    cache.close()
@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+import dictionary
+from dictionary import get_dictionaries, CompiledDictionary, MappedDictionary, MAPPED_DICTIONARY_NAME
+
+SINO_SIMILAR = {"好": ["好", "妤", "奻"], "妤": ["妤", "好"], "衰": ["衰", "哀"], "哀": ["哀", "衰", float("nan")]}
+QN_SINO = {"tốt": ["好"], "suy": ["衰"], "ai": ["哀", "埃"], "dư": ["妤"]}
+
+@pytest.fixture
+def sources(tmp_path, monkeypatch):
+    paths = [str(tmp_path / "SinoNom_similar_Dic.xlsx"), str(tmp_path / "QuocNgu_SinoNom_Dic.xlsx")]
+    for path in paths:
+        with open (path, 'wb') as file:
+            file.write(b"v1")
+
+    #! The spreadsheets are stand-ins, their content only matters for the stamps and hashes
+    read = []
+    def read_dictionaries(Sino_sim_path, QN_Sino_path):
+        read.append(Sino_sim_path)
+        return SINO_SIMILAR, QN_SINO
+    monkeypatch.setattr(dictionary, "read_dictionaries", read_dictionaries)
+    return paths, read
+
+def all_codes(compiled):
+    letters = list(SINO_SIMILAR) + ["埃", "奻", "x"]
+    return [compiled.match_code(letter, QN_word) for letter in letters for QN_word in list(QN_SINO) + ["x"]]
+
+def test_cache_is_mapped_and_compiled_on_demand(sources, monkeypatch):
+    paths, read = sources
+    get_dictionaries(*paths)
+    assert read == [paths[0]]
+    assert os.path.exists(os.path.join(os.path.dirname(paths[0]), MAPPED_DICTIONARY_NAME))
+
+    #! Without compiled, the index is not read
+    def fail(*args):
+        raise AssertionError("the compiled index was read")
+    with monkeypatch.context() as patch:
+        patch.setattr(dictionary, "read_compiled_index", fail)
+        SinoNom_Similar_Dict, QN_SinoNom_Dict = get_dictionaries(*paths)
+    assert isinstance(SinoNom_Similar_Dict, MappedDictionary)
+    assert dict(QN_SinoNom_Dict.items()) == QN_SINO
+    assert SinoNom_Similar_Dict["哀"] == ["哀", "衰"]
+
+    _, _, compiled = get_dictionaries(*paths, compiled = True)
+    assert read == [paths[0]]
+    assert all_codes(compiled) == all_codes(CompiledDictionary(SINO_SIMILAR, QN_SINO))
+
+def test_touched_spreadsheets_are_stamped_again(sources, monkeypatch):
+    paths, read = sources
+    get_dictionaries(*paths)
+
+    os.utime(paths[0], ns = (1, 1))
+    get_dictionaries(*paths)
+    assert read == [paths[0]]
+
+    #! The new stamps were written, the next open does not hash the spreadsheets
+    def fail(paths):
+        raise AssertionError("the spreadsheets were hashed")
+    monkeypatch.setattr(dictionary, "files_fingerprint", fail)
+    get_dictionaries(*paths, compiled = True)
+    assert read == [paths[0]]
+
+def test_changed_spreadsheets_rebuild_the_cache(sources):
+    paths, read = sources
+    get_dictionaries(*paths)
+
+    with open (paths[1], 'wb') as file:
+        file.write(b"v2")
+    get_dictionaries(*paths)
+    assert read == [paths[0], paths[0]]
+
+def test_mapped_workers_get_the_compiled_index(sources):
+    from main import init_worker, worker_state
+    from alignment import get_Sino_QN_equal
+    paths, read = sources
+    get_dictionaries(*paths)
+
+    #! As in a worker started with spawn or forkserver, which inherits nothing
+    worker_state.clear()
+    try:
+        init_worker(paths[0], paths[1], None)
+        SinoNom_Similar_Dict, QN_SinoNom_Dict, compiled = worker_state["dictionaries"]
+        assert isinstance(compiled, CompiledDictionary)
+        assert get_Sino_QN_equal(SinoNom_Similar_Dict, QN_SinoNom_Dict, dictionary = compiled) == compiled.match_code
+        assert all_codes(compiled) == all_codes(CompiledDictionary(SINO_SIMILAR, QN_SINO))
+        assert read == [paths[0]]
+    finally:
+        worker_state.clear()
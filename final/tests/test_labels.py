@@ -0,0 +1,95 @@
+import os
+import json
+import random
+
+import labels
+from labels import parse_label_line, read_label_boxes, LABEL_SIDECAR_SUFFIX
+from extract_input import write_if_changed
+
+CHARACTERS = ['字', '𠀀', '\U000f0000', 'a', ' ', '"', "'", '\\', '\x07', 'é', '}', "', 'points': [", ']']
+
+def random_boxes(rnd, count: int):
+    boxes = []
+    for _ in range(count):
+        transcription = "".join(rnd.choice(CHARACTERS) for _ in range(rnd.randint(0, 12)))
+        if (rnd.random() < 0.5):
+            points = [[rnd.uniform(-5, 2000), rnd.choice([1e-7, 1e20, -0.0, rnd.uniform(0, 3000)])] for _ in range(4)]
+        else:
+            points = [[rnd.randint(0, 2000), rnd.randint(0, 3000)] for _ in range(4)]
+        boxes.append({"transcription": transcription, "points": points})
+    return boxes
+
+def write_label_file(path: str, lines: list):
+    with open (path, 'w', encoding = 'utf-8') as file:
+        file.write("\n".join(lines) + "\n")
+
+def test_parse_python_and_json_lines():
+    rnd = random.Random(0)
+    for _ in range(1000):
+        boxes = random_boxes(rnd, rnd.randint(0, 6))
+        #! str(ocr_data) as sentence_bbox writes it, or JSON as in the midterm Label.txt
+        assert parse_label_line(str(boxes)) == boxes
+        assert parse_label_line(json.dumps(boxes, ensure_ascii = rnd.random() < 0.5)) == boxes
+
+def test_parse_blank_line():
+    assert parse_label_line("") == []
+    assert parse_label_line("  \n") == []
+
+def test_sidecar_round_trip(tmp_path, monkeypatch):
+    rnd = random.Random(1)
+    lines = [random_boxes(rnd, 5), random_boxes(rnd, 3)]
+    expected = lines[0] + lines[1]
+    label_path = str(tmp_path / "image1_label.txt")
+    write_label_file(label_path, [str(boxes) for boxes in lines])
+
+    boxes = read_label_boxes(label_path)
+    assert boxes.to_dicts() == expected
+    assert os.path.exists(label_path + LABEL_SIDECAR_SUFFIX)
+
+    #! The second read comes from the sidecar, with the same points and dtype
+    def fail(line):
+        raise AssertionError("the label file was parsed again")
+    monkeypatch.setattr(labels, "parse_label_line", fail)
+    sidecar = read_label_boxes(label_path)
+    assert sidecar.to_dicts() == expected
+    assert sidecar.points.dtype == boxes.points.dtype
+
+def test_integer_points_stay_integers(tmp_path):
+    label_path = str(tmp_path / "image1_label.txt")
+    boxes = [{"transcription": "字", "points": [[1, 2], [3, 4], [5, 6], [7, 8]]}]
+    write_label_file(label_path, [str(boxes)])
+
+    read_label_boxes(label_path)
+    sidecar = read_label_boxes(label_path)
+    assert sidecar.points.dtype.kind == "i"
+    assert sidecar.to_dicts() == boxes
+
+def test_sidecar_invalidated_by_changed_label_file(tmp_path):
+    rnd = random.Random(2)
+    label_path = str(tmp_path / "image1_label.txt")
+    write_label_file(label_path, [str(random_boxes(rnd, 4))])
+    read_label_boxes(label_path)
+
+    changed = random_boxes(rnd, 2)
+    write_label_file(label_path, [str(changed)])
+    os.utime(label_path, ns = (1, 1))
+    assert read_label_boxes(label_path).to_dicts() == changed
+
+    #! A corrupt sidecar is ignored and written again
+    with open (label_path + LABEL_SIDECAR_SUFFIX, 'r+b') as file:
+        file.write(b"garbage!")
+    assert read_label_boxes(label_path).to_dicts() == changed
+    assert read_label_boxes(label_path).to_dicts() == changed
+
+def test_unchanged_label_file_keeps_its_sidecar(tmp_path):
+    rnd = random.Random(3)
+    label_path = str(tmp_path / "image1_label.txt")
+    text = str(random_boxes(rnd, 3)) + "\n"
+    assert write_if_changed(label_path, text)
+    read_label_boxes(label_path)
+    stamp = os.stat(label_path).st_mtime_ns
+
+    #! Writing the same labels again leaves the file, and so its sidecar, as they were
+    assert not write_if_changed(label_path, text)
+    assert os.stat(label_path).st_mtime_ns == stamp
+    assert write_if_changed(label_path, str(random_boxes(rnd, 1)) + "\n")
@@ -0,0 +1,108 @@
+import random
+
+import pytest
+
+from levenstein import levenstein, levenstein_pairs, levenstein_batch, levenstein_distance
+
+ENGINES = ["numpy", "bitparallel", "banded", "hirschberg"]
+
+def code_equal(element1, element2):
+    #! Same kind of codes as Sino_QN_equal: 0 no match, 1 exact match, 2 partial match
+    if (element1 == element2):
+        return 1
+    if (element1 % 3 == element2 % 3):
+        return 2
+    return 0
+
+def random_pairs(seed: int, count: int, max_length: int = 30, alphabet: int = 5):
+    rnd = random.Random(seed)
+    pairs = []
+    for _ in range(count):
+        input1 = [rnd.randrange(alphabet) for _ in range(rnd.randint(0, max_length))]
+        #! Mostly similar lists, as the Sino/QN sentences are, with some unrelated ones
+        if (rnd.random() < 0.7):
+            input2 = [element if rnd.random() < 0.8 else rnd.randrange(alphabet) for element in input1]
+            start = rnd.randint(0, len(input2))
+            del input2[start:start + rnd.randint(0, 3)]
+        else:
+            input2 = [rnd.randrange(alphabet) for _ in range(rnd.randint(0, max_length))]
+        pairs.append((input1, input2))
+    return pairs
+
+def alignment_cost(output1: list, output2: list, equal_function = None):
+    cost = 0
+    for element1, element2 in zip(output1, output2):
+        if (element1 == "*" or element2 == "*"):
+            cost += 1
+        elif (not (equal_function(element1, element2) if equal_function else element1 == element2)):
+            cost += 2
+    return cost
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("equal_function", [None, code_equal])
+def test_engines_match_python(engine, equal_function):
+    for input1, input2 in random_pairs(seed = 1, count = 400):
+        expected = levenstein(input1, input2, equal_function, engine = "python")
+        assert levenstein(input1, input2, equal_function, engine = engine, band = 1) == expected
+
+def test_large_inputs_switch_to_hirschberg():
+    for input1, input2 in random_pairs(seed = 2, count = 200):
+        expected = levenstein(input1, input2, code_equal, engine = "python")
+        assert levenstein(input1, input2, code_equal, engine = "numpy", max_cells = 10) == expected
+        assert levenstein(input1, input2, code_equal, engine = "python", max_cells = 10) == expected
+
+def test_pairs_with_codes():
+    for input1, input2 in random_pairs(seed = 3, count = 100):
+        output1, output2 = levenstein(input1, input2, code_equal)
+        pairs = list(levenstein_pairs(input1, input2, code_equal, with_codes = True))
+        assert [pair[:2] for pair in pairs] == list(zip(output1, output2))
+        assert [pair[2] for pair in pairs] == [None if "*" in (element1, element2) else code_equal(element1, element2)
+                                               for element1, element2 in zip(output1, output2)]
+
+def test_batch_matches_python():
+    pairs = random_pairs(seed = 4, count = 200)
+    expected = [levenstein(input1, input2, code_equal) for input1, input2 in pairs]
+    assert levenstein_batch(pairs, code_equal) == expected
+    #! Small groups split the pairs into many stacked alignments
+    assert levenstein_batch(pairs, code_equal, max_cells = 100) == expected
+
+def test_distance_matches_alignment_cost():
+    for input1, input2 in random_pairs(seed = 5, count = 300):
+        output1, output2 = levenstein(input1, input2, code_equal)
+        cost = alignment_cost(output1, output2, code_equal) if output1 else len(input1) + len(input2)
+        assert levenstein_distance(input1, input2, code_equal) == cost
+        for upper_bound in (0, cost - 1, cost, cost + 1):
+            if (upper_bound < 0):
+                continue
+            expected = cost if cost <= upper_bound else upper_bound + 1
+            assert levenstein_distance(input1, input2, code_equal, upper_bound = upper_bound) == expected
+
+def test_empty_inputs():
+    for engine in ["python"] + ENGINES:
+        assert levenstein([], [1, 2], engine = engine) == ([], [])
+        assert levenstein([1], [], engine = engine) == ([], [])
+
+def test_batch_aligns_oversized_pairs_alone(monkeypatch):
+    import levenstein
+    pairs = random_pairs(seed = 6, count = 20, max_length = 10)
+    pairs.append(([index % 5 for index in range(60)], [index % 4 for index in range(50)]))
+    expected = [levenstein.levenstein(input1, input2, code_equal) for input1, input2 in pairs]
+
+    #! Only the small pairs are stacked, the oversized one goes to Hirschberg
+    stacked = []
+    row_stepper = levenstein.row_stepper
+    def recording_stepper(m, batch = None):
+        stacked.append((batch, m))
+        return row_stepper(m, batch = batch)
+    monkeypatch.setattr(levenstein, "row_stepper", recording_stepper)
+    hirschberg = []
+    hirschberg_directions = levenstein.hirschberg_directions
+    def recording_hirschberg(input1, input2, equal_function = None):
+        hirschberg.append((len(input1), len(input2)))
+        return hirschberg_directions(input1, input2, equal_function)
+    monkeypatch.setattr(levenstein, "hirschberg_directions", recording_hirschberg)
+
+    results = levenstein_batch(pairs, code_equal, max_cells = 200, with_codes = True)
+    assert [result[:2] for result in results] == expected
+    assert hirschberg == [(60, 50)]
+    assert all(m <= 10 for batch, m in stacked if batch is not None)
@@ -0,0 +1,83 @@
+import sqlite3
+
+import numpy as np
+
+import manifest
+from manifest import RunManifest
+from records import CharRecord
+
+def write_file(path, content: bytes):
+    with open (path, 'wb') as file:
+        file.write(content)
+    return str(path)
+
+def page_records():
+    points = np.arange(16, dtype = float).reshape(2, 4, 2)
+    return [CharRecord("page1.jpg", "1.01.01", 1, 0, points, "好", 'n', "tốt"),
+            CharRecord("page1.jpg", "1.01.01", 1, 1, points, "衰", 'r', None),
+            CharRecord.inserted("suy")]
+
+def page_inputs(tmp_path):
+    image_files = [(write_file(tmp_path / "image1_label.txt", b"[]"), write_file(tmp_path / "image1_char.txt", b"0 0"))]
+    dictionary_paths = [write_file(tmp_path / "similar.xlsx", b"v1"), write_file(tmp_path / "quoc_ngu.xlsx", b"v1")]
+    return image_files, dictionary_paths
+
+def test_unchanged_page_is_reused(tmp_path):
+    path = str(tmp_path / "run_manifest.sqlite")
+    image_files, dictionary_paths = page_inputs(tmp_path)
+    records = page_records()
+
+    run = RunManifest(path, dictionary_paths)
+    key = run.key("folder", "page1")
+    fingerprint = run.fingerprint(image_files, ["好衰"], ["tốt suy"])
+    assert run.get(key, fingerprint) is None
+    run.put(key, fingerprint, records)
+    run.close()
+
+    run = RunManifest(path, dictionary_paths)
+    reused = run.get(key, run.fingerprint(image_files, ["好衰"], ["tốt suy"]))
+    assert [record.to_list() for record in reused] == [record.to_list() for record in records]
+    #! The records of a sentence box still share one points array
+    assert reused[0].char_points is reused[1].char_points
+    assert run.report() == "Run manifest: 1 pages reused, 0 pages aligned"
+    run.close()
+
+def test_changed_inputs_are_aligned_again(tmp_path):
+    path = str(tmp_path / "run_manifest.sqlite")
+    image_files, dictionary_paths = page_inputs(tmp_path)
+
+    run = RunManifest(path, dictionary_paths)
+    key = run.key("folder", "page1")
+    fingerprint = run.fingerprint(image_files, ["好衰"], ["tốt suy"])
+    run.put(key, fingerprint, page_records())
+
+    #! Other sentences for the page
+    assert run.get(key, run.fingerprint(image_files, ["好衰"], ["tốt"])) is None
+
+    #! Another content of a label file
+    write_file(image_files[0][0], b"[{}]")
+    assert run.get(key, run.fingerprint(image_files, ["好衰"], ["tốt suy"])) is None
+    write_file(image_files[0][0], b"[]")
+    assert run.get(key, run.fingerprint(image_files, ["好衰"], ["tốt suy"])) is not None
+    run.close()
+
+    #! Other dictionaries
+    write_file(dictionary_paths[0], b"v2")
+    run = RunManifest(path, dictionary_paths)
+    assert run.get(key, run.fingerprint(image_files, ["好衰"], ["tốt suy"])) is None
+    run.close()
+
+def test_other_manifest_version_is_emptied(tmp_path, monkeypatch):
+    path = str(tmp_path / "run_manifest.sqlite")
+    image_files, dictionary_paths = page_inputs(tmp_path)
+
+    run = RunManifest(path, dictionary_paths)
+    run.put(run.key("folder", "page1"), run.fingerprint(image_files, [], []), page_records())
+    run.close()
+
+    monkeypatch.setattr(manifest, "MANIFEST_VERSION", manifest.MANIFEST_VERSION + "-next")
+    RunManifest(path, dictionary_paths).close()
+
+    connection = sqlite3.connect(path)
+    assert connection.execute("SELECT COUNT(*) FROM pages").fetchone() == (0,)
+    connection.close()
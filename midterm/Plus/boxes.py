@@ -0,0 +1,193 @@
+import math
+import numpy as np
+from bisect import bisect_right
+
+class BoxSet:
+    """
+    Boxes of a page as one (N, 4, 2) array of points and a list of transcriptions
+    The 4 points of a box go clockwise from its top-left corner, as in the label files
+    The array is float, or integer when every coordinate read was an integer, so that
+    the exported points keep the text they had in the label files
+    """
+    def __init__ (self, points = (), transcriptions = None):
+        points = np.asarray(points)
+        if (points.dtype.kind not in "iuf"):
+            points = points.astype(float)
+        self.points = points.reshape(-1, 4, 2)
+
+        if (transcriptions is None):
+            transcriptions = [""] * len(self.points)
+        self.transcriptions = list(transcriptions)
+
+    @classmethod
+    def from_dicts (cls, boxes: list):
+        """
+        Build a box set from the {"points", "transcription"} dicts of a label file
+        """
+        return cls([box["points"] for box in boxes], [box.get("transcription", "") for box in boxes])
+
+    def to_dicts (self):
+        """
+        The boxes as {"points", "transcription"} dicts, only needed when exporting
+        """
+        return [{"transcription": transcription, "points": points}
+                for transcription, points in zip(self.transcriptions, self.points.tolist())]
+
+    def __len__ (self):
+        return len(self.points)
+
+    def take (self, indices):
+        """
+        Box set of the boxes at indices, in that order
+        """
+        indices = list(indices)
+        return BoxSet(self.points[indices], [self.transcriptions[i] for i in indices])
+
+    @classmethod
+    def concatenate (cls, box_sets: list):
+        if (len(box_sets) == 0):
+            return cls()
+        return cls(np.concatenate([box_set.points for box_set in box_sets]),
+                   [transcription for box_set in box_sets for transcription in box_set.transcriptions])
+
+    #! Extents of the boxes
+    @property
+    def min_x (self):
+        return self.points[:, :, 0].min(axis = 1)
+
+    @property
+    def max_x (self):
+        return self.points[:, :, 0].max(axis = 1)
+
+    @property
+    def min_y (self):
+        return self.points[:, :, 1].min(axis = 1)
+
+    @property
+    def max_y (self):
+        return self.points[:, :, 1].max(axis = 1)
+
+    #! Edges used to order the boxes: the inner ones of each side
+    @property
+    def left_edges (self):
+        return np.maximum(self.points[:, 0, 0], self.points[:, 3, 0])
+
+    @property
+    def right_edges (self):
+        return np.minimum(self.points[:, 1, 0], self.points[:, 2, 0])
+
+    @property
+    def tops (self):
+        return np.maximum(self.points[:, 0, 1], self.points[:, 1, 1])
+
+    @property
+    def bottoms (self):
+        return np.minimum(self.points[:, 2, 1], self.points[:, 3, 1])
+
+    @property
+    def heights (self):
+        return np.maximum(self.points[:, 3, 1] - self.points[:, 0, 1], self.points[:, 2, 1] - self.points[:, 1, 1])
+
+    def x_overlaps (self, index: int):
+        """
+        Mask of the boxes whose top side overlaps in x the top side of the box at index
+        """
+        lefts, rights = self.points[:, 0, 0], self.points[:, 1, 0]
+        return (lefts <= rights[index]) & (lefts[index] <= rights) & (lefts <= rights)
+
+    def stack (self):
+        """
+        Merge the boxes into the first one: the transcriptions are joined and the bottom
+        of the first box is lowered by the height of each following box
+        """
+        points = self.points[:1].copy()
+        for height in self.heights[1:]:
+            points[0, 2:4, 1] += height
+
+        return BoxSet(points, ["".join(self.transcriptions)])
+
+class IntervalIndex:
+    """
+    Index of x-intervals, built once per page so that the intervals overlapping a given one
+    are found without looking at the others: the intervals are sorted by their low end and
+    a tree keeps the largest high end of each range of them, so a query only descends into
+    the ranges holding an overlapping interval, in O((k + 1) log n) for k intervals found
+    The intervals found are taken out of the index, so that later queries skip them
+    Intervals with their low end past their high end overlap nothing and are left out
+    """
+    def __init__ (self, lows, highs):
+        lows = np.asarray(lows, dtype = float)
+        highs = np.asarray(highs, dtype = float)
+        self.highs = highs.tolist()
+
+        #! Leaves of the tree, in the order of the low ends
+        valid = np.flatnonzero(lows <= highs)
+        order = valid[np.argsort(lows[valid], kind = 'stable')]
+        self.order = order.tolist()
+        self.sorted_lows = lows[order].tolist()
+        self.positions = {i: position for position, i in enumerate(self.order)}
+
+        #! Largest high end of the intervals under each node, -inf for the intervals taken out
+        self.size = 1
+        while (self.size < len(self.order)):
+            self.size *= 2
+        self.tree = [-math.inf] * (2 * self.size)
+        self.tree[self.size:self.size + len(self.order)] = highs[order].tolist()
+        for node in range(self.size - 1, 0, -1):
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+
+    def add (self, i: int):
+        """
+        Put back an interval taken out
+        """
+        if (i in self.positions):
+            node = self.size + self.positions[i]
+            high = self.highs[i]
+            while (node and self.tree[node] < high):
+                self.tree[node] = high
+                node //= 2
+
+    def remove (self, i: int):
+        if (i in self.positions):
+            node = self.size + self.positions[i]
+            high = self.tree[node]
+            self.tree[node] = -math.inf
+            node //= 2
+
+            # Only the nodes whose largest high end came from the interval change
+            while (node and self.tree[node] == high):
+                largest = max(self.tree[2 * node], self.tree[2 * node + 1])
+                if (largest == high):
+                    break
+                self.tree[node] = largest
+                node //= 2
+
+    def take (self, low: float, high: float):
+        """
+        Take out the intervals overlapping the closed interval [low, high] and return their indices
+        """
+        # Only the intervals starting at or before high can overlap it
+        end = bisect_right(self.sorted_lows, high)
+        found = set()
+        visited = []
+
+        tree = self.tree
+        stack = [(1, 0, self.size)]
+        while stack:
+            node, start, stop = stack.pop()
+            if (start >= end or tree[node] < low):
+                continue
+            if (node >= self.size):
+                found.add(self.order[node - self.size])
+                tree[node] = -math.inf
+                continue
+            visited.append(node)
+            middle = (start + stop) // 2
+            stack.append((2 * node, start, middle))
+            stack.append((2 * node + 1, middle, stop))
+
+        # The children of a node were visited after it
+        for node in reversed(visited):
+            tree[node] = max(tree[2 * node], tree[2 * node + 1])
+
+        return found
@@ -1,7 +1,5 @@
 import os
 import re
-import fitz
-from fitz import Page
 from tqdm import tqdm
 
 def extract (filename_list: list[str], text_processing_funcs = None, save_extract_info = True, extract_save_dir = None):
@@ -18,8 +16,11 @@ def extract (filename_list: list[str], text_processing_funcs = None, save_extrac
     Returns:
     - output_list: List of tuples containing extracted images and processed text for each file.
     """
+    # PyMuPDF is only loaded when PDF files are extracted
+    import fitz
+    
     # Helper function to extract images from a PDF page
-    def extract_image (page: Page):
+    def extract_image (page: "fitz.Page"):
         # Get images on the page
         image_list = page.get_images(full = True)
         images = []
@@ -1,31 +1,121 @@
-def levenstein (input1: list, input2: list, equal_function = None):
+import numpy as np
+
+#! Direction codes of the traceback matrix
+DIAG, UP, LEFT = 1, 2, 3
+
+#! Above this number of cells, the engines keeping the whole matrix switch to the Hirschberg engine
+MAX_TRACEBACK_CELLS = 10_000_000
+
+def levenstein (input1: list, input2: list, equal_function = None, engine = "python", band = 8, max_cells = None):
     """
     This function simulates Levenstein algorithm for calculate the M.E.D between two list of elements
     I also require to input a function for defining the equation between to elements, in default, it is "="
+    The "numpy" engine runs the same dynamic programming with vectorized rows and returns the same alignment
+    The "bitparallel" engine computes the LCS with big integers as bit vectors and returns the same alignment
+    The "banded" engine only evaluates cells near the diagonal, widening the band until the result is exact
+    The "hirschberg" engine keeps O(m log n) costs in memory and is used by "python" and "numpy" above max_cells cells
+    """
+    output1 = []
+    output2 = []
+    
+    for element1, element2 in levenstein_pairs(input1, input2, equal_function = equal_function,
+                                               engine = engine, band = band, max_cells = max_cells):
+        output1.append(element1)
+        output2.append(element2)
+        
+    return output1, output2
+
+def levenstein_pairs (input1: list, input2: list, equal_function = None, engine = "python", band = 8, max_cells = None):
+    """
+    Same alignment as levenstein, but yields the aligned (element1, element2) pairs one by one
+    Missing elements are replaced by "*"
     """
     n = len(input1)
     m = len(input2)
     
     if (n == 0 or m == 0):
-        return [], []
+        return
+    
+    if (max_cells is None):
+        max_cells = MAX_TRACEBACK_CELLS
+    if (engine in ("python", "numpy") and (n + 1) * (m + 1) > max_cells):
+        engine = "hirschberg"
+    
+    if (engine == "python"):
+        direction_at = python_directions(input1, input2, equal_function)
+    elif (engine == "numpy"):
+        direction_at = numpy_directions(input1, input2, equal_function)
+    elif (engine == "bitparallel"):
+        direction_at = bitparallel_directions(input1, input2, equal_function)
+    elif (engine == "banded"):
+        direction_at = banded_directions(input1, input2, equal_function, band = band)
+    elif (engine == "hirschberg"):
+        direction_at = hirschberg_directions(input1, input2, equal_function)
+    else:
+        raise ValueError(f"Unknown levenstein engine: {engine}")
+    
+    yield from traceback_pairs(input1, input2, direction_at)
+
+def traceback_pairs (input1: list, input2: list, direction_at):
+    """
+    Follow the directions from the bottom-right cell, direction_at(i, j) gives the direction of a cell,
+    then yield the aligned pairs from the first to the last one
+    The path is kept as one byte per move instead of prepending to the output lists
+    """
+    moves = bytearray()
+    index1, index2 = len(input1), len(input2)
+    
+    while (index1 > 0 and index2 > 0):
+        direction = direction_at(index1, index2)
+        moves.append(direction)
+        if (direction != LEFT):
+            index1 -= 1
+        if (direction != UP):
+            index2 -= 1
     
-    minDistance = [[[0, 'n'] for _ in range (m + 1)] for _ in range (n + 1)]
-    for i in range (n + 1):
-        minDistance[i][0][0] = i
-    for j in range (m + 1):
-        minDistance[0][j][0] = j
+    #! The remaining elements of one list are aligned with "*"
+    moves.extend(bytes([UP]) * index1)
+    moves.extend(bytes([LEFT]) * index2)
+    
+    index1, index2 = 0, 0
+    for direction in reversed(moves):
+        if (direction == UP):
+            yield input1[index1], "*"
+            index1 += 1
+        
+        elif (direction == LEFT):
+            yield "*", input2[index2]
+            index2 += 1
         
+        else:
+            yield input1[index1], input2[index2]
+            index1 += 1
+            index2 += 1
+
+def python_directions (input1: list, input2: list, equal_function = None):
+    """
+    Run the Levenstein dynamic programming cell by cell, keeping two rows of costs
+    The directions are stored in one bytearray of (n + 1) * (m + 1) bytes
+    """
+    n = len(input1)
+    m = len(input2)
+    
+    previous = list(range(m + 1))
+    current = [0] * (m + 1)
+    directions = bytearray((n + 1) * (m + 1))
+    
     for i in range (1, n + 1):
+        current[0] = i
         for j in range (1, m + 1):
             #! Deletion
-            minDistance[i][j][0] = minDistance[i - 1][j][0] + 1
-            minDistance[i][j][1] = 'u' #! Up
+            cost = previous[j] + 1
+            direction = UP
             
             #! Insertion
-            if (minDistance[i][j - 1][0] + 1 < minDistance[i][j][0]):
-                minDistance[i][j][0] = minDistance[i][j - 1][0] + 1
-                minDistance[i][j][1] = 'l' #! Left
-                
+            if (current[j - 1] + 1 < cost):
+                cost = current[j - 1] + 1
+                direction = LEFT
+            
             #! Substitution
             compare = None
             if (equal_function):
@@ -33,42 +123,392 @@ def levenstein (input1: list, input2: list, equal_function = None):
             else:
                 compare = (input1[i - 1] == input2[j - 1])
             
-            if (compare and minDistance[i - 1][j - 1][0] <= minDistance[i][j][0]):
-                minDistance[i][j][0] = minDistance[i - 1][j - 1][0]
-                minDistance[i][j][1]= 'd' #! Diag
-            if (not compare and minDistance[i - 1][j - 1][0] + 2 < minDistance[i][j][0]):
-                minDistance[i][j][0] = minDistance[i - 1][j - 1][0] + 2
-                minDistance[i][j][1]= 'd'
-         
-    output1 = []
-    output2 = []
-    index1, index2 = n, m
+            if (compare and previous[j - 1] <= cost):
+                cost = previous[j - 1]
+                direction = DIAG
+            if (not compare and previous[j - 1] + 2 < cost):
+                cost = previous[j - 1] + 2
+                direction = DIAG
+            
+            current[j] = cost
+            directions[i * (m + 1) + j] = direction
+        
+        previous, current = current, previous
     
-    while (index1 > 0 and index2 > 0):
-        if (minDistance[index1][index2][1] == 'u'):
-            output1 = [input1[index1 - 1]] + output1
-            output2 = ["*"] + output2
-            index1 -= 1
+    return lambda i, j: directions[i * (m + 1) + j]
+
+def intern_elements (elements: list):
+    """
+    Map every element of a list to a small integer ID, equal elements share the same ID
+    Returns the array of IDs and the list of distinct elements (indexed by ID)
+    """
+    ids = dict()
+    codes = np.fromiter((ids.setdefault(element, len(ids)) for element in elements),
+                        dtype = np.int64, count = len(elements))
+    uniques = list(ids.keys())
+    
+    return codes, uniques
+
+def match_table (input1: list, input2: list, equal_function = None):
+    """
+    Intern both lists and build the boolean table telling which of their distinct elements are equal
+    The equal function is only called once for each pair of distinct elements
+    Returns the IDs of input1, the IDs of input2 and the table
+    """
+    codes1, uniques1 = intern_elements(input1)
+    codes2, uniques2 = intern_elements(input2)
+    table = np.zeros((len(uniques1), len(uniques2)), dtype = bool)
+    
+    if (equal_function is None):
+        #! Only elements present in both lists can be equal
+        ids2 = {element: index for index, element in enumerate(uniques2)}
+        for index1, element1 in enumerate(uniques1):
+            if (element1 in ids2):
+                table[index1, ids2[element1]] = True
+    else:
+        for index1, element1 in enumerate(uniques1):
+            for index2, element2 in enumerate(uniques2):
+                if (equal_function(element1, element2)):
+                    table[index1, index2] = True
+    
+    return codes1, codes2, table
+
+def match_matrix (input1: list, input2: list, equal_function = None):
+    """
+    Build the (n, m) boolean matrix telling which elements of input1 and input2 are equal
+    The table of distinct elements is expanded with one fancy indexing
+    """
+    codes1, codes2, table = match_table(input1, input2, equal_function)
+    
+    return table[codes1[:, None], codes2[None, :]]
+
+def row_stepper (m: int):
+    """
+    Create the function computing one row of the Levenstein dynamic programming on NumPy arrays
+    Substitution costs 0 for equal elements and 2 otherwise, insertion and deletion cost 1
+    The work buffers are allocated once and reused by every row of at most m + 1 columns
+    """
+    offsets = np.arange(m + 1, dtype = np.int64)
+    diag_buffer = np.empty(m, dtype = np.int64)
+    up_buffer = np.empty(m, dtype = np.int64)
+    left_buffer = np.empty(m, dtype = np.int64)
+    
+    def step (previous: np.ndarray, current: np.ndarray, i: int, match_row: np.ndarray, row: np.ndarray = None):
+        """
+        Fill current (costs of row i) from previous (costs of row i - 1), and row with the directions of row i
+        """
+        width = len(previous) - 1
+        diag, up, offset = diag_buffer[:width], up_buffer[:width], offsets[:width + 1]
         
-        elif (minDistance[index1][index2][1] == 'l'):
-            output1 = ["*"] + output1
-            output2 = [input2[index2 - 1]] + output2
-            index2 -= 1
+        #! Substitution and deletion
+        np.add(previous[:-1], 2, out = diag)
+        np.subtract(diag, 2, out = diag, where = match_row)
+        np.add(previous[1:], 1, out = up)
+        np.minimum(diag, up, out = current[1:])
         
-        elif (minDistance[index1][index2][1] == 'd'):
-            output1 = [input1[index1 - 1]] + output1
-            output2 = [input2[index2 - 1]] + output2
-            index1 -= 1
-            index2 -= 1
+        #! Insertion: current[j] = min(current[j], current[j - 1] + 1) as a running minimum of current[j] - j
+        current[0] = i
+        np.subtract(current, offset, out = current)
+        np.minimum.accumulate(current, out = current)
+        np.add(current, offset, out = current)
+        
+        if (row is not None):
+            #! Equal elements prefer diagonal, then up, then left when costs are equal
+            #! Different elements prefer up, then left, then diagonal
+            left = left_buffer[:width]
+            np.add(current[:-1], 1, out = left)
+            row.fill(DIAG)
+            row[left == current[1:]] = LEFT
+            row[up == current[1:]] = UP
+            row[match_row & (diag == current[1:])] = DIAG
+    
+    return step
+
+def levenstein_directions (match: np.ndarray):
+    """
+    Run the Levenstein dynamic programming row by row on NumPy arrays
+    Returns the final distance and the (n + 1, m + 1) uint8 matrix of traceback directions
+    """
+    n, m = match.shape
+    step = row_stepper(m)
+    previous = np.arange(m + 1, dtype = np.int64)
+    current = np.empty(m + 1, dtype = np.int64)
+    directions = np.zeros((n + 1, m + 1), dtype = np.uint8)
+    
+    for i in range (1, n + 1):
+        step(previous, current, i, match[i - 1], directions[i, 1:])
+        previous, current = current, previous
+    
+    return int(previous[m]), directions
+
+def numpy_directions (input1: list, input2: list, equal_function = None):
+    """
+    Vectorized engine of levenstein, it gives exactly the same directions as the loop
+    """
+    _, directions = levenstein_directions(match_matrix(input1, input2, equal_function))
+    
+    return lambda i, j: directions[i, j]
+
+def choose_direction (equal: bool, diag: int, up: int, left: int):
+    """
+    Pick the direction of a cell from the costs of its three moves, like the loop of levenstein does
+    Equal elements let the diagonal win ties, then up, then left
+    Different elements let up win ties, then left, then diagonal
+    """
+    if (equal and diag <= up and diag <= left):
+        return DIAG
+    elif (up <= left and up <= diag):
+        return UP
+    elif (left <= diag):
+        return LEFT
+    else:
+        return DIAG
+
+def match_bitmasks (input1: list, input2: list, equal_function = None):
+    """
+    For every element of input2, build a Python integer whose bit i is set when input2's element equals input1[i]
+    The equal function is only called once for each pair of distinct elements
+    """
+    #! Bitmask of the positions of every distinct element of input1
+    positions = dict()
+    for index, element in enumerate(input1):
+        positions[element] = positions.get(element, 0) | (1 << index)
+    
+    masks = dict()
+    for element2 in input2:
+        if (element2 in masks):
+            continue
+        
+        if (equal_function is None):
+            masks[element2] = positions.get(element2, 0)
+        else:
+            mask = 0
+            for element1, position in positions.items():
+                if (equal_function(element1, element2)):
+                    mask |= position
+            masks[element2] = mask
+    
+    return [masks[element2] for element2 in input2]
+
+def lcs_columns (masks: list, n: int):
+    """
+    Bit-parallel LCS (Hyyro): process one column per element of input2 with big integer operations
+    Returns, for every column j, the integer whose bit i is set when LCS[i + 1][j] = LCS[i][j] + 1
+    """
+    full = (1 << n) - 1
+    vector = full
+    columns = [0]
+    
+    for mask in masks:
+        matched = vector & mask
+        vector = ((vector + matched) | (vector - matched)) & full
+        columns.append(~vector & full)
+    
+    return columns
+
+def bitparallel_directions (input1: list, input2: list, equal_function = None):
+    """
+    Bit-parallel engine of levenstein, it gives exactly the same directions as the loop
+    With substitution cost 2, the distance is n + m - 2 * LCS, so only the LCS columns are kept
+    and the costs of a cell are rebuilt from them
+    """
+    n = len(input1)
+    
+    masks = match_bitmasks(input1, input2, equal_function)
+    columns = lcs_columns(masks, n)
+    
+    def lcs (i, j):
+        return (columns[j] & ((1 << i) - 1)).bit_count()
+    
+    def direction_at (i, j):
+        #! Costs of the three moves, from distance = i + j - 2 * LCS
+        equal = (masks[j - 1] >> (i - 1)) & 1 == 1
+        diag = i + j - 2 - 2 * lcs(i - 1, j - 1) + (0 if equal else 2)
+        up = i + j - 2 * lcs(i - 1, j)
+        left = i + j - 2 * lcs(i, j - 1)
+        
+        return choose_direction(equal, diag, up, left)
+    
+    return direction_at
+
+def band_directions (input1: list, input2: list, equal_function, band: int):
+    """
+    Run the Levenstein dynamic programming only on the cells at most band columns away from the
+    diagonals joining (0, 0) and (n, m), cells outside the band are treated as unreachable
+    Returns the distance found inside the band and a function giving the direction of a band cell
+    """
+    n = len(input1)
+    m = len(input2)
+    low = min(0, m - n) - band
+    high = max(0, m - n) + band
+    unreachable = float("inf")
+    
+    #! Every row keeps its first column, its costs and its directions
+    starts = [0]
+    previous = list(range(min(m, high) + 1))
+    directions = [bytearray(len(previous))]
+    
+    for i in range (1, n + 1):
+        start = max(0, i + low)
+        end = min(m, i + high)
+        previous_start = starts[-1]
+        previous_end = previous_start + len(previous) - 1
+        current = [0] * (end - start + 1)
+        row = bytearray(end - start + 1)
+        
+        for j in range (start, end + 1):
+            if (j == 0):
+                current[0] = i
+                continue
+            
+            compare = equal_function(input1[i - 1], input2[j - 1])
+            diag = up = left = unreachable
+            if (previous_start <= j - 1 <= previous_end):
+                diag = previous[j - 1 - previous_start] + (0 if compare else 2)
+            if (j <= previous_end):
+                up = previous[j - previous_start] + 1
+            if (j > start):
+                left = current[j - 1 - start] + 1
+            
+            direction = choose_direction(compare, diag, up, left)
+            row[j - start] = direction
+            current[j - start] = diag if direction == DIAG else (up if direction == UP else left)
+        
+        starts.append(start)
+        directions.append(row)
+        previous = current
+    
+    def direction_at (i, j):
+        return directions[i][j - starts[i]]
+    
+    return previous[-1], direction_at
+
+def banded_directions (input1: list, input2: list, equal_function = None, band: int = 8):
+    """
+    Banded (Ukkonen) engine of levenstein, it gives exactly the same directions on the traceback path
+    Any path leaving the band costs at least |n - m| + 2 * (band + 1), so a distance below that bound
+    is exact, otherwise the band is doubled and the dynamic programming computed again
+    """
+    n = len(input1)
+    m = len(input2)
+    
+    #! Remember the comparisons so a wider band does not repeat them
+    compared = dict()
+    def equal (element1, element2):
+        key = (element1, element2)
+        if (key not in compared):
+            if (equal_function):
+                compared[key] = equal_function(element1, element2)
+            else:
+                compared[key] = (element1 == element2)
+        return compared[key]
+    
+    while (True):
+        distance, direction_at = band_directions(input1, input2, equal, band)
+        if (distance < abs(n - m) + 2 * (band + 1) or band >= max(n, m)):
+            return direction_at
+        band = max(1, 2 * band)
+
+def hirschberg_directions (input1: list, input2: list, equal_function = None, block_cells: int = 1 << 20):
+    """
+    Divide-and-conquer (Hirschberg) engine of levenstein, it gives exactly the same directions on the traceback path
+    Only a few rows of costs are kept: the middle row of a range is computed, the path is traced
+    through the lower half first, then through the upper half down to the column where it crossed
+    Ranges of at most block_cells cells are solved with a small direction matrix
+    Unlike the forward-backward Hirschberg split, this follows the traceback of the full matrix, so it
+    keeps the top row of every range on the recursion stack and computes the upper half of each range
+    again: O(m log n) costs in memory besides the block, and O(n m log n) time
+    """
+    n = len(input1)
+    m = len(input2)
+    
+    codes1, codes2, table = match_table(input1, input2, equal_function)
+    step = row_stepper(m)
+    path = dict()
+    rows = np.empty((2, m + 1), dtype = np.int64)
+    
+    def forward (top: np.ndarray, first: int, last: int, width: int, directions: np.ndarray = None):
+        #! Costs of row last from the costs of row first, on columns 0..width
+        #! Every range runs in the same pair of row buffers, the result is only valid until the next call
+        previous, current = rows[0, :width + 1], rows[1, :width + 1]
+        previous[:] = top[:width + 1]
+        for i in range (first + 1, last + 1):
+            row = None if directions is None else directions[i - first, 1:]
+            step(previous, current, i, table[codes1[i - 1], codes2[:width]], row)
+            previous, current = current, previous
+        return previous
+    
+    def trace (top: np.ndarray, first: int, last: int, width: int):
+        #! Record the path from (last, width) up to row first, return the column where it reaches row first
+        if ((last - first) * (width + 1) <= block_cells or last - first == 1):
+            directions = np.zeros((last - first + 1, width + 1), dtype = np.uint8)
+            forward(top, first, last, width, directions)
             
-    while (index1 > 0):
-        output1 = [input1[index1 - 1]] + output1
-        output2 = ["*"] + output2
-        index1 -= 1
-    
-    while (index2 > 0):
-        output1 = ["*"] + output1
-        output2 = [input2[index2 - 1]] + output2
-        index2 -= 1
+            i, j = last, width
+            while (i > first and j > 0):
+                direction = directions[i - first, j]
+                path[(i, j)] = direction
+                if (direction != LEFT):
+                    i -= 1
+                if (direction != UP):
+                    j -= 1
+            return j
+        
+        middle = (first + last) // 2
+        j = trace(forward(top, first, middle, width).copy(), middle, last, width)
+        if (j > 0):
+            j = trace(top, first, middle, j)
+        return j
+    
+    trace(np.arange(m + 1, dtype = np.int64), 0, n, m)
+    
+    return lambda i, j: path[(i, j)]
+
+def levenstein_distance (input1: list, input2: list, equal_function = None, upper_bound = None):
+    """
+    Compute only the M.E.D of levenstein, with two rolling rows of costs and no traceback
+    With upper_bound, stop as soon as the distance is known to be above it and return upper_bound + 1
+    The equal function is called once for each pair of distinct elements, and only for the rows computed
+    """
+    n = len(input1)
+    m = len(input2)
+    
+    #! Every alignment needs at least |n - m| insertions or deletions
+    if (upper_bound is not None and abs(n - m) > upper_bound):
+        return upper_bound + 1
+    if (n == 0 or m == 0):
+        return n + m
+    
+    codes1, uniques1 = intern_elements(input1)
+    codes2, uniques2 = intern_elements(input2)
+    match_rows = dict()
+    
+    step = row_stepper(m)
+    previous = np.arange(m + 1, dtype = np.int64)
+    current = np.empty(m + 1, dtype = np.int64)
+    columns_left = np.arange(m, -1, -1, dtype = np.int64)
+    
+    for i in range (1, n + 1):
+        code = codes1[i - 1]
+        if (code not in match_rows):
+            element1 = uniques1[code]
+            if (equal_function is None):
+                match_rows[code] = np.fromiter((element1 == element2 for element2 in uniques2),
+                                               dtype = bool, count = len(uniques2))
+            else:
+                match_rows[code] = np.fromiter((bool(equal_function(element1, element2)) for element2 in uniques2),
+                                               dtype = bool, count = len(uniques2))
         
-    return output1, output2
\ No newline at end of file
+        step(previous, current, i, match_rows[code][codes2])
+        previous, current = current, previous
+        
+        #! Lower bound of the distance: best cost of the row plus the unavoidable indels left
+        if (upper_bound is not None):
+            if (np.min(previous + np.abs(columns_left - (n - i))) > upper_bound):
+                return upper_bound + 1
+    
+    distance = int(previous[m])
+    if (upper_bound is not None and distance > upper_bound):
+        return upper_bound + 1
+    
+    return distance
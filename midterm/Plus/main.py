@@ -1,7 +1,6 @@
-# Import necessary modules for file operations, regular expressions, and JSON handling
+# Import necessary modules for file operations and regular expressions
 import os
 import re
-import json
 
 # Import custom functions for extracting input and text processing
 from extract_input import extract, thanh_truyen_text_processing, thanh_mau_text_processing
@@ -9,6 +8,7 @@ from dictionary import get_dictionaries
 
 # Import alignment functions for sorting, aligning boxes, and characters
 from alignment import sort_boxes_in_correct_order, box_alignment, char_alignment
+from labels import read_label_boxes
 
 # Import export functions for saving processed data
 from export import export_excel_file, export_OCR_result_directory
@@ -58,19 +58,8 @@ def get_data(filename_list, text_processing_funcs = None,
                 if (not os.path.exists(file_path)):
                     break
                 
-                # Initialize a list to hold box data for the current image
-                boxes = []
-
-                # Read and parse the label file as JSON
-                with open(file_path, "r", encoding = "utf-8") as file:
-                    for line in file:
-                        json_data = line.replace("'", '"')
-                        json_data = re.sub(
-                            r'\\U([0-9A-Fa-f]{8})', 
-                            lambda match: chr(int(match.group(1), 16)), 
-                            json_data
-                        )
-                        boxes += json.loads(json_data)
+                # Read the boxes of the label file, from its binary sidecar when the file is unchanged
+                boxes = read_label_boxes(file_path)
                 
                 # Sort boxes into the correct reading order
                 boxes = sort_boxes_in_correct_order(boxes)
@@ -106,7 +95,7 @@ def get_data(filename_list, text_processing_funcs = None,
                                   f'{filename[:(len(filename) - 4)]}.{page_number}.{box_str}']
                     
                     # Extract points for the current box
-                    points = [tuple(point) for point in boxes[box_index]['points']]
+                    points = [tuple(point) for point in boxes.points[box_index].tolist()]
                     
                     # Append aligned and marked data for the box
                     if aligned_boxes[box_index][1] == "":
@@ -122,24 +111,25 @@ def get_data(filename_list, text_processing_funcs = None,
                     
     return box_data
 
-#! Define a list of filenames for data processing
-filename_list = ["data/Prj_19_CLC_CAC THANH TRUYEN THANG 5 GIROLAMO MAIORICA - AI.pdf",
-                 "data/Prj_19_CLC_Thien Chua Thanh Mau q. thuong MAIORICA - AI.pdf"]
+if __name__ == "__main__":
+    #! Define a list of filenames for data processing
+    filename_list = ["data/Prj_19_CLC_CAC THANH TRUYEN THANG 5 GIROLAMO MAIORICA - AI.pdf",
+                     "data/Prj_19_CLC_Thien Chua Thanh Mau q. thuong MAIORICA - AI.pdf"]
 
-#! Define a list of text processing functions
-text_processing_funcs = [thanh_truyen_text_processing,
-                         thanh_mau_text_processing]
+    #! Define a list of text processing functions
+    text_processing_funcs = [thanh_truyen_text_processing,
+                             thanh_mau_text_processing]
 
-#! Get data
-box_data = get_data(filename_list = filename_list,
-                    text_processing_funcs = text_processing_funcs,
-                    extract_save_dir = 'OCR_result',
-                    Sino_sim_path = "dictionary/SinoNom_similar_Dic.xlsx",
-                    QN_Sino_path = "dictionary/QuocNgu_SinoNom_Dic.xlsx")
+    #! Get data
+    box_data = get_data(filename_list = filename_list,
+                        text_processing_funcs = text_processing_funcs,
+                        extract_save_dir = 'OCR_result',
+                        Sino_sim_path = "dictionary/SinoNom_similar_Dic.xlsx",
+                        QN_Sino_path = "dictionary/QuocNgu_SinoNom_Dic.xlsx")
 
-#!
-export_OCR_result_directory(in_dir = "OCR_result",
-                            out_dir = "../Label/image_label")
+    #!
+    export_OCR_result_directory(in_dir = "OCR_result",
+                                out_dir = "../Label/image_label")
 
-#! Export the processed and aligned data to an Excel file with color-coded formatting
-export_excel_file(file_name = "../Label/result.xlsx", data = box_data)  
\ No newline at end of file
+    #! Export the processed and aligned data to an Excel file with color-coded formatting
+    export_excel_file(file_name = "../Label/result.xlsx", data = box_data)  
\ No newline at end of file
@@ -106,4 +106,5 @@ def perform_extract_images_ocr (image_dir):
             perform_extract_images_ocr(item_path)
 
 #! Usage     
-perform_extract_images_ocr(image_dir = "OCR_result/CÁC THÁNH TRUYỆN THÁNG 01 GIROLAMO MAIORICA - AI")
\ No newline at end of file
+if __name__ == "__main__":
+    perform_extract_images_ocr(image_dir = "OCR_result/CÁC THÁNH TRUYỆN THÁNG 01 GIROLAMO MAIORICA - AI")
\ No newline at end of file